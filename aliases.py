@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+# lookup of team names via alias.json, built once instead of scanning alias.json on every call
+
+import json
+import re
+
+
+# kicker url names look like "borussia-dortmund-17", the number is the kicker id
+KICKER_NAME = re.compile(r"^[a-z0-9]+(-[a-z0-9]+)*-(\d+)$")
+
+
+class AliasIndex:
+    """
+    Hash index over alias.json
+
+    alias.json keys are the team names used throughout the project, values are lists of other names of the
+    team (names used on kicker pages and the kicker url name). Lookups:
+        name -> key -> kicker url name -> kicker id
+
+    Raises ValueError on load if one name belongs to more than one team
+    """
+
+    def __init__(self, alias_json):
+        self.alias_json = alias_json
+
+        # name -> key, every key also maps to itself
+        self.name_key = {key: key for key in alias_json}
+        # key -> kicker url name and kicker id
+        self.key_kicker = {}
+        self.key_id = {}
+
+        ambiguous = {}
+        for key, names in alias_json.items():
+            for name in names:
+                if self.name_key.get(name, key) != key:
+                    ambiguous.setdefault(name, {self.name_key[name]}).add(key)
+                self.name_key[name] = key
+
+                match = KICKER_NAME.match(name)
+                if match is not None and key not in self.key_kicker:
+                    self.key_kicker[key] = name
+                    self.key_id[key] = int(match.group(2))
+
+        if len(ambiguous) > 0:
+            raise ValueError("Ambiguous aliases in alias.json: " +
+                             ", ".join("{} -> {}".format(n, sorted(k)) for n, k in ambiguous.items()))
+
+    @classmethod
+    def fromFile(cls, alias_file):
+        """
+        Load alias.json from :alias_file: and build the index
+        """
+        with open(alias_file, "r", encoding="utf8") as j:
+            return cls(json.load(j))
+
+    def team(self, name):
+        """
+        Returns key of alias_json for passed name, returns name itself if nothing is found
+        """
+        return self.name_key.get(name, name)
+
+    def kickerName(self, name):
+        """
+        Returns the team string used in kicker urls, raises KeyError for unknown teams
+        """
+        return self.key_kicker[self.team(name)]
+
+    def kickerId(self, name):
+        """
+        Returns the numeric kicker id of the team, raises KeyError for unknown teams
+        """
+        return self.key_id[self.team(name)]
+
+    def idDict(self):
+        """
+        Dictionary of all keys -> kicker id
+        """
+        return dict(self.key_id)
+
+    def translate(self, names):
+        """
+        Vectorized team() for a Series of names (categorical names are returned as strings)
+        """
+        names = names.astype(object)
+        return names.map(self.name_key).fillna(names)
+
+    def kickerNames(self, names):
+        """
+        Vectorized kickerName() for a Series of names, NaN for unknown teams
+        """
+        return self.translate(names).map(self.key_kicker)
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+
+# Walk-forward backtest: replays seasons in time order, every gameday is predicted by models fit only on
+# games played before it, and scored with kicktipp points
+
+import os
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+import build_dfs
+import encoding
+import features
+import model
+import storage
+
+
+# kicktipp points for exact result, right goal difference (not for draws) and right tendency
+POINTS = {"exact": 4, "diff": 3, "tendency": 2}
+
+
+def kicktippPoints(p1, p2, a1, a2, points=POINTS):
+    """
+    Vectorized kicktipp scoring of predicted results :p1: : :p2: against actual results :a1: : :a2:
+    Returns dict of arrays points, exact, diff, tendency (hit flags, every exact hit is a diff and tendency hit)
+    """
+    p1, p2, a1, a2 = [np.asarray(x) for x in (p1, p2, a1, a2)]
+
+    exact = (p1 == a1) & (p2 == a2)
+    tendency = np.sign(p1 - p2) == np.sign(a1 - a2)
+    diff = (p1 - p2) == (a1 - a2)
+
+    # a draw with wrong score only gets tendency points
+    out = np.where(exact, points["exact"],
+                   np.where(diff & (a1 != a2), points["diff"],
+                            np.where(tendency, points["tendency"], 0)))
+    return {"points": out, "exact": exact, "diff": diff, "tendency": tendency}
+
+
+def prepare(human_df):
+    """
+    Returns ml frame of :human_df: (human_table.csv after switch_teams) sorted by game date, its sparse 
+    feature matrix (teams encoded by encoding.TeamEncoder) and the Season and Game_Date of each row
+    """
+    human_df = human_df.copy()
+    human_df["Game_Date"] = pd.to_datetime(human_df["Game_Date"])
+    human_df = human_df.sort_values("Game_Date", kind="mergesort").reset_index(drop=True)
+
+    dates = human_df["Game_Date"]
+    ml_df = build_dfs.build_ml_df(human_df, ml_csv=None)
+
+    # all teams of the history are known, so one encoding serves every walk-forward step
+    X = encoding.TeamEncoder().fit_transform(ml_df)
+
+    # ml frame keeps the original team names for the report
+    info = pd.DataFrame({"Season": features.seasonFromDates(dates), "Game_Date": dates,
+                         "League": human_df["CurLeague"], "GameDay": human_df["GameDay"],
+                         "Team1": human_df["Team1"], "Team2": human_df["Team2"]})
+    return ml_df, X, info
+
+
+def _backtestSeason(ml_df, X, info, season, create_t1goals, create_goaldiff, params, refit, min_train):
+    """
+    Walk-forward over all gamedays of :season:, returns list of result frames (one row per predicted game)
+    ml_df, X and info are sorted by date, so the training set of a gameday is a prefix of ml_df
+    """
+    dates = info["Game_Date"].values
+    in_season = info[info["Season"] == season]
+
+    # gamedays in the order they started
+    gamedays = in_season.groupby(["League", "GameDay"])["Game_Date"].min().sort_values()
+
+    out = []
+    fitted_on = None
+    for (league, gameday), start in gamedays.items():
+        # games before the first game of the gameday
+        n_train = int(np.searchsorted(dates, np.datetime64(start), side="left"))
+        if n_train < min_train:
+            continue
+
+        # reuse models until :refit: new games have been played
+        if fitted_on is None or n_train - fitted_on >= refit:
+            train = ml_df.iloc[:n_train]
+            t1goals_model = create_t1goals(train, silent=1, params=params, X=X[:n_train])
+            goaldiff_model = create_goaldiff(train, silent=1, params=params, X=X[:n_train])
+            fitted_on = n_train
+
+        # info has a default index, so labels are row positions of X
+        rows = in_season.index[(in_season["League"] == league) & (in_season["GameDay"] == gameday)]
+        results = model.predict_results(t1goals_model, goaldiff_model, X[rows.values], info.loc[rows])
+
+        actual = ml_df.loc[rows]
+        results["Actual1"] = actual["Result_t1goals"].values.astype(int)
+        results["Actual2"] = (actual["Result_t1goals"] - actual["Result_goaldiff"]).values.astype(int)
+        results["TrainGames"] = n_train
+
+        score = kicktippPoints(results["T1Goals"], results["T2Goals"], results["Actual1"], results["Actual2"])
+        for key, values in score.items():
+            results[key.capitalize()] = values
+        out.append(results)
+
+    print("Season ", season, " done")
+    return out
+
+
+def backtest(human_df, seasons=None, create_t1goals=model.create_t1goals_model,
+             create_goaldiff=model.create_goaldiff_model, params=None, refit=1, min_train=500, n_jobs=-1):
+    """
+    Walk-forward backtest of the t1goals / goaldiff approach
+
+    Seasons are replayed in time order: models are fit on all games played before the first game of a gameday
+    and predict the games of that gameday. Seasons are run in parallel processes.
+
+    :human_df: human_table.csv frame (after switch_teams, Team1 is home team)
+    :seasons: list of seasons to backtest, default all but the first
+    :create_t1goals: :create_goaldiff: model functions (model.create_*), called as 
+                                       create(df, silent=1, params=params, X=X)
+    :params: hyperparameters passed to the create functions
+    :refit: fitted models are reused until this many new games have been played since the fit
+    :min_train: gamedays with less training games are skipped
+    :n_jobs: number of processes, -1 uses all cores
+
+    returns (games, gamedays): one row per predicted game, and per gameday the points and hit rates
+    """
+    ml_df, X, info = prepare(human_df)
+
+    if seasons is None:
+        seasons = sorted(info["Season"].unique())[1:]
+
+    per_season = Parallel(n_jobs=n_jobs)(delayed(_backtestSeason)(ml_df, X, info, season, create_t1goals,
+                                                                  create_goaldiff, params, refit, min_train)
+                                         for season in seasons)
+
+    frames = [df for season in per_season for df in season]
+    if len(frames) == 0:
+        return pd.DataFrame(), pd.DataFrame()
+    games = pd.concat(frames, ignore_index=True)
+
+    gamedays = games.groupby(["Season", "League", "GameDay"]).agg(Games=("Points", "size"),
+                                                                  Points=("Points", "sum"),
+                                                                  Exact=("Exact", "mean"),
+                                                                  Diff=("Diff", "mean"),
+                                                                  Tendency=("Tendency", "mean")).reset_index()
+    gamedays["PointsPerGame"] = gamedays["Points"] / gamedays["Games"]
+    return games, gamedays
+
+
+def summary(games):
+    """
+    Points and hit rates per season and league of backtest() games
+    """
+    return games.groupby(["Season", "League"]).agg(Games=("Points", "size"), Points=("Points", "sum"),
+                                                   PointsPerGame=("Points", "mean"), Exact=("Exact", "mean"),
+                                                   Diff=("Diff", "mean"), Tendency=("Tendency", "mean"))
+
+
+if __name__ == "__main__":
+
+    human_df = storage.readCsv("human_table", os.path.join(build_dfs.data_context.data_folder, "human_table.csv"))
+    games, gamedays = backtest(human_df)
+    print(summary(games))
@@ -0,0 +1,648 @@
+# -*- coding: utf-8 -*-
+
+# Timings of the vectorized implementations against the old per row versions, and memory of the typed tables
+# Uses the data loaded by build_dfs.py, run entire file or call single benchmarks
+
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+import pendulum
+
+import build_dfs
+import storage
+
+
+# # # # # # # # # LEGACY VERSION # # # # # # # # #
+
+def rawTables(data_folder=None):
+    """
+    Returns allTeamResults, allTables and allCoaches read from the csv files of :data_folder: (defaults to the 
+    build_dfs data folder) the way the legacy loop expects them: untyped, with the table name fixes of 
+    context.DataContext and coach dates converted
+    """
+    data_folder = data_folder if data_folder is not None else build_dfs.data_context.data_folder
+    read = lambda name: pd.read_csv(os.path.join(data_folder, storage.TABLES[name]["csv"]), sep=";", encoding="utf8")
+    
+    allTables = read("AllTables").replace({'1. FC Dynamo Dresden' : 'Dynamo Dresden',
+                                           "LR Ahlen" : 'Rot Weiss Ahlen',
+                                           'Arminia Bielefeld (' : 'Arminia Bielefeld'})
+    allCoaches = read("AllTeamCoaches")
+    for col in ["von", "bis"]:
+        allCoaches[col] = pd.to_datetime(allCoaches[col], errors="coerce", format="%d.%m.%Y")
+    return read("AllTeamResults"), allTables, allCoaches
+
+
+def _pastLeagues(allTables, team, start_season):
+    """
+    returns the number of leagues team has played in, in last 5 seasons
+    Will return 3 for each season team was not in 1 or 2 (regardless of actual league)
+    """
+    outList = []
+    for i in range(1,6):
+        # will fail if team wasnt in league 1 or 2
+        try:            
+            l = allTables[ (allTables["Team"] == team) & (allTables["Season"] == start_season-i) & (allTables["GameDay"] == 34) 
+                          ]["League"].values[0]
+        except:
+            l = 3
+        outList.append(l)
+    return outList
+
+
+def createHumanFrameLegacy(allTeamResults=None, allTables=None, allCoaches=None, outFile="human_table.csv"):
+    """
+    Old per game loop replaced by build_dfs.createHumanFrame(), only kept to compare against
+    
+    Use basic data (data_gathering.py output) to create comprehensive DataFrame 
+    for actual modelling
+    
+    :allX: input DataFrames from data_gathering.py as read from csv, default to rawTables()
+    :outFile: will store the data, if already contains games, these will be skipped in consecutive runs
+    """
+    
+    print("Creating Human Frame")
+    
+    if allTeamResults is None or allTables is None or allCoaches is None:
+        raw_results, raw_tables, raw_coaches = rawTables()
+        allTeamResults = allTeamResults if allTeamResults is not None else raw_results
+        allTables = allTables if allTables is not None else raw_tables
+        allCoaches = allCoaches if allCoaches is not None else raw_coaches
+    
+    # try loading output file or create new one if path is given
+    try:
+        outDF = pd.read_csv(outFile, sep=";", encoding="utf8")
+    except:
+        outDF = pd.DataFrame(columns=['Retrieve_Date',
+                                  'Game_Date',
+                                  
+                                 "Team1", 
+                                 "Team2", 
+                                 
+                                 "CurLeague", # Current League
+                                 "Result", # Game Endresult
+                                 
+                                 "Team1_Home", # 1 if Team 1 is Hometeam, else 0
+                                 "Team2_Home", # 1 if Team 2 is Hometeam, else 0
+                                 
+                                 "GameTimeOfDay", # Time of Game
+                                 "GameWeekday", # Weekday of Game
+                                 "GameDay", # GameDay in League
+                                 
+                                 "GamesSinceLastWin1", # No. of games since last won game Team1
+                                 "GamesSinceLastWin2", # No. of games since last won game Team2
+                                 
+                                 "TimeSinceLastGame1", # Time in Hours since last game Team 1
+                                 "TimeSinceLastGame2", # Time in Hours since last game Team 2
+                                 
+                                 "LastGameOverTime1", # Was last game of Team 1 with overtime or penalty shootout
+                                 "LastGameOverTime2", # Was last game of Team 2 with overtime or penalty shootout
+                                 
+                                 "TimeSinceLastCoach1", # Time since Team 1 has current coach (if any)
+                                 "TimeSinceLastCoach2", # Time since Team 2 has current coach (if any)
+                                 
+                                 "CurrentPoints1", # current position in league Team 1
+                                 "CurrentPoints2", # current position in league Team 2
+                                 
+                                 "CurrentPosition1", # current position in league Team 1
+                                 "CurrentPosition2", # current position in league Team 2
+                                 
+                                 "CurrentGoalDif1", # current goal difference Team 1
+                                 "CurrentGoalDif2", # current goal difference Team 2
+                                 
+                                 "CurrentWin1", # current wins in season of Team 1
+                                 "CurrentDraws1", # current draws in season of Team 1
+                                 "CurrentLoss1", # current losses in season of Team 1
+                                 "CurrentWin2", # current wins in season of Team 2
+                                 "CurrentDraws2", # current draws in season of Team 2
+                                 "CurrentLoss2", # current losses in season of Team 2
+                                 
+                                 "LastSeasonPosition1", # last season's final position in league Team 1
+                                 "LastSeasonPosition2", # last season's final position in league Team 2
+                                 
+                                 "LastSeasonLeague1", # last season league of Team 1
+                                 "LastSeasonLeague2", # last season league of Team 2
+                                 
+                                 "Past5YearsInThisLeague1", # 1 if Team1 played in same league for past 5 years, else 0
+                                 "Past5YearsInThisLeague2", # 1 if Team2 played in same league for past 5 years, else 0
+                                 
+                                 "LastDirectGame1", # Last direct meeting of both teams results (0:0 if none)
+                                 "LastDirectGame2", # 2nd last direct meeting of both teams results (0:0 if none)
+                                 "LastDirectGame3", # 3rd last direct meeting of both teams results (0:0 if none)
+                                 
+                                 "LastDirectGame1_time", # Time in days since last direct meeting of both teams results (99999 if none)
+                                 "LastDirectGame2_time", # Time in days since 2nd last direct meeting of both teams results (99999 if none)
+                                 "LastDirectGame3_time", # Time in days since 3rd last direct meeting of both teams results (99999 if none)
+                                 
+                                 "LastGameTeam1_1", # Last 5 game results of Team 1                                 
+                                 "LastGameTeam1_2",
+                                 "LastGameTeam1_3",
+                                 "LastGameTeam1_4",
+                                 "LastGameTeam1_5",
+                                 "LastGameTeam2_1", # Last 5 game results of Team 2
+                                 "LastGameTeam2_2",
+                                 "LastGameTeam2_3",
+                                 "LastGameTeam2_4",
+                                 "LastGameTeam2_5",
+                                 
+                                 "CL_candidate1", # Team 1 playing Champions League this season
+                                 "CL_candidate2", # Team 2 playing Champions League this season
+                                 
+                                 "EL_candidate1", # Team 1 playing Europe League this season
+                                 "EL_candidate2", # Team 2 playing Europe League this season
+                                 ])
+    
+    
+    
+    # # # general DF column adding etc. # # # 
+    
+    # typed tables (storage.py) come with parsed goals and Date, the loop below derives its own from strings
+    allTeamResults = allTeamResults.drop(columns=["T1Goals", "T2Goals", "Date"], errors="ignore")
+    allTeamResults = allTeamResults.astype({col: object for col in allTeamResults.columns 
+                                            if isinstance(allTeamResults[col].dtype, pd.CategoricalDtype)})
+        
+    # split x:x into two columns T1Goals for Hometeam Goals and T2Goals for away team goals
+    allTeamResults = allTeamResults.join(allTeamResults["Score"].str.split(":", expand=True)
+                        ).rename(columns={0:"T1Goals", 1:"T2Goals"})
+    
+    allTeamResults = allTeamResults.replace('-', np.nan)
+    
+    # calculate field with goal difference
+    allTeamResults["Intmd"] = allTeamResults["T1Goals"].astype(float, errors='ignore').subtract(allTeamResults["T2Goals"].astype(float, errors='ignore'))
+    # divide by its self absolute value ->  team1 win == 1, draw == 0, loss = -1
+    allTeamResults["IsWin"] = allTeamResults["Intmd"].divide( allTeamResults["Intmd"].abs())
+    # replace division by 0 values with 0, but only for existing results
+    allTeamResults["IsWin"] = allTeamResults[allTeamResults["Score"] != "-:-"]["IsWin"].fillna(0)
+    
+    
+    # convert Termin column to new DateTime type column Date
+    allTeamResults["Date"] = pd.to_datetime(allTeamResults["Termin"].str.slice(4), errors='coerce', format='%d.%m.%y %H:%M')
+    
+    
+    
+    # list will hold tuples of games, if same game is found in another teams list, its not put into df again
+    skip_list = [] 
+    
+    # iterate over allTeamResults and extract infos for each game
+    for row_tup in allTeamResults.iterrows():
+        row_index = row_tup[0]
+        row = row_tup[1] # original row returns a tuple with first elem as index, second elem as data
+        
+        print('\r', '{} / {}  '.format(row_index, len(allTeamResults)), end="")
+    
+        # skip adding if game was not in 1st or 2nd BL
+        if row["Wettbewerb"] not in ['BL', '2.BL']:
+            continue
+        
+        # skip adding if game has not been played yet
+        if row["Score"] == '-:-':
+            continue
+        
+        pendulum_time = pendulum.from_format(row["Termin"][4:], 'DD.MM.YY HH:mm', tz='Europe/Berlin')  
+        date_season = build_dfs.seasonFromDate(pendulum_time)
+        
+        # skip if game is before 2005, as one seaosn before is needed for data gathering
+        if date_season < 5:
+            continue
+        
+        
+        # # # # Check things same for both teams # # # # # 
+        
+        team1 = build_dfs.translateTeam( row["Team"] )
+        team2 = build_dfs.translateTeam( row["Gegner"] )
+        
+        # determine numeric league
+        if row["Wettbewerb"] == 'BL':
+            cur_league = 1
+        else:
+            cur_league = 2
+        result = row["Score"] 
+        
+        # skip game if was already in list in loaded output csv
+        if len( outDF[ (outDF["Team1"] == team1) & (outDF['Game_Date'] == pendulum_time.to_date_string())] ) > 0:
+            continue
+        
+        # skip game if already in list (bc reverse order of teams used as input before), if not in list, append to list then continue
+        if (team2, team1, row["Termin"]) in skip_list:
+            continue        
+        skip_list.append( (team1, team2, row["Termin"]) )
+        
+        
+        # get home team 
+        if row["Wo"] == "H":
+            t1_home = 1
+            t2_home = 0
+        elif row["Wo"] == "A":
+            t1_home = 0
+            t2_home = 1
+    
+       
+        # # # time-related caluclations # # # 
+        
+        
+        # game time in minutes since midnight, e.g. 13:00h == 780
+        gameTimeMinutes = pendulum_time.hour * 60 + pendulum_time.minute        
+        
+        # get gameDay, only works for BL gamedays
+        gameDay = int(row["Spt./Runde"][ : row["Spt./Runde"].find(".")]) 
+        
+        
+        # # # # # # # # OTHERS # # # # # # # # # 
+        
+        
+        # get no of games since last win
+        
+        # get df with only current team and only games WITH result 
+        lf_df1 = allTeamResults[ (allTeamResults["Team"] == build_dfs.getKickerTeamName(team1)) & (allTeamResults["Score"] != "-:-") ]
+        lf_df2 = allTeamResults[ (allTeamResults["Team"] == build_dfs.getKickerTeamName(team2)) & (allTeamResults["Score"] != "-:-") ]
+        # sort lf_df by date, so last games are on bottom
+        lf_df1 = lf_df1.sort_values("Date")        
+        lf_df2 = lf_df2.sort_values("Date") 
+        # cut_off all games after current
+        lf_df1_cur = lf_df1[lf_df1["Date"] < pendulum_time.to_datetime_string()]  
+        lf_df2_cur = lf_df2[lf_df2["Date"] < pendulum_time.to_datetime_string()] 
+        # get last game with win (0 if last game was win) - reverse IsWin column as list and return index of first element that is 1
+        last_game_won1 = lf_df1_cur["IsWin"].tolist()[::-1].index(1)
+        last_game_won2 = lf_df2_cur["IsWin"].tolist()[::-1].index(1)
+        
+        
+        # get time since last game in hours       
+        lf_df1_reidx = lf_df1.reset_index()
+        lf_df2_reidx = lf_df2.reset_index()
+         # get index of row above current row
+        t1_idx = lf_df1_reidx[lf_df1_reidx["Termin"] == row["Termin"]].index - 1
+        t2_idx = lf_df2_reidx[lf_df2_reidx["Termin"] == row["Termin"]].index - 1 
+        # get game time with index above
+        try:
+            last_game_time1 = pendulum.from_format(lf_df1_reidx.iloc[t1_idx]["Termin"].values[0][4:], 'DD.MM.YY HH:mm', tz='Europe/Berlin') 
+        except:
+            continue
+        try:
+            last_game_time2 = pendulum.from_format(lf_df2_reidx.iloc[t2_idx]["Termin"].values[0][4:], 'DD.MM.YY HH:mm', tz='Europe/Berlin')  
+        except:
+            continue
+        # get difference to current game in hours
+        t_diff1 = (pendulum_time - last_game_time1).in_hours()
+        t_diff2 = (pendulum_time - last_game_time2).in_hours()
+        
+        # was last game overtime 
+        t1_overtime = lf_df1_reidx.iloc[t1_idx]["Overtime"].values[0]
+        t2_overtime = lf_df2_reidx.iloc[t2_idx]["Overtime"].values[0]
+        
+        
+        # time since last coach
+        t1_coaches = allCoaches[(allCoaches["Team"] == build_dfs.getKickerTeamName(team1)) & (allCoaches["von"] < pendulum_time.to_date_string())
+                               ].sort_values("von")
+        t2_coaches = allCoaches[(allCoaches["Team"] == build_dfs.getKickerTeamName(team2)) & (allCoaches["von"] < pendulum_time.to_date_string())
+                               ].sort_values("von")
+        # time difference in days between game and last coach recruiting
+        try:
+            t1_coach_diff = (pendulum_time - pendulum.instance(t1_coaches.iloc[-1]["von"], tz='Europe/Berlin')).in_days()
+        except:
+            t1_coach_diff = 99999
+        try:
+            t2_coach_diff = (pendulum_time - pendulum.instance(t2_coaches.iloc[-1]["von"], tz='Europe/Berlin')).in_days()
+        except:
+            t2_coach_diff = 99999
+        
+        
+        # Get last 5 games as list
+        l5Games1 = []
+        l5Games2 = []
+        for g in range(1,6):
+            t1_idx = lf_df1_reidx[lf_df1_reidx["Termin"] == row["Termin"]].index - g
+            l5Games1.append(lf_df1_reidx.iloc[t1_idx]["Score"].values[0])
+            t2_idx = lf_df2_reidx[lf_df2_reidx["Termin"] == row["Termin"]].index - g 
+            l5Games2.append(lf_df2_reidx.iloc[t2_idx]["Score"].values[0])     
+        
+        
+        # Get last 3 direct games between both teams (manually account for teams that havent met 3 times, set 0:0 default)
+        last_direct_df = lf_df1_reidx[ (lf_df1_reidx["Gegner"] == team2) & (lf_df1_reidx["Date"] < pendulum_time.to_datetime_string())].sort_values("Date")
+        
+        if len(last_direct_df) == 0:
+            last_direct_3 = "0:0"
+            last_direct_3_time = 99999
+            last_direct_2 = "0:0"
+            last_direct_2_time = 99999
+            last_direct_1 = "0:0"
+            last_direct_1_time = 99999
+            
+        
+        elif len(last_direct_df) == 1:
+            last_direct_3 = "0:0"
+            last_direct_3_time = 99999
+            last_direct_2 = "0:0"
+            last_direct_2_time = 99999
+            
+            last_direct_1 = last_direct_df.iloc[-1]["Score"]
+            last_direct_1_time = (pendulum_time - pendulum.instance(last_direct_df.iloc[-1]["Date"])).in_days()
+        
+        elif len(last_direct_df) == 2:
+            last_direct_3 = "0:0"
+            last_direct_3_time = 99999
+            
+            last_direct_2 = last_direct_df.iloc[-2]["Score"]
+            last_direct_2_time = (pendulum_time - pendulum.instance(last_direct_df.iloc[-2]["Date"])).in_days()
+            
+            last_direct_1 = last_direct_df.iloc[-1]["Score"]
+            last_direct_1_time = (pendulum_time - pendulum.instance(last_direct_df.iloc[-1]["Date"])).in_days()
+        
+        else:
+            last_direct_3 = last_direct_df.iloc[-3]["Score"]
+            last_direct_3_time = (pendulum_time - pendulum.instance(last_direct_df.iloc[-3]["Date"])).in_days()
+            
+            last_direct_2 = last_direct_df.iloc[-2]["Score"]
+            last_direct_2_time = (pendulum_time - pendulum.instance(last_direct_df.iloc[-2]["Date"])).in_days()
+            
+            last_direct_1 = last_direct_df.iloc[-1]["Score"]
+            last_direct_1_time = (pendulum_time - pendulum.instance(last_direct_df.iloc[-1]["Date"])).in_days()
+        
+            
+    
+        
+        
+        # table entry for date
+        if gameDay > 1:
+            table_entry1 = allTables[ (allTables["Team"] == team1) & (allTables["Season"] == date_season) & (allTables["GameDay"] == gameDay-1) ]
+            table_entry2 = allTables[ (allTables["Team"] == team2) & (allTables["Season"] == date_season) & (allTables["GameDay"] == gameDay-1) ]
+            
+        # create dummy df with all 0 data for first gameday
+        else:
+            table_entry1 = pd.DataFrame(data={'Season':date_season, 'League': cur_league, 'GameDay':gameDay, 'rank':0,
+           'Team':team1, 'sp':0, 'g':0, 'u':0, 'v':0, 'tore':0, 'diff':0, 'points':0}, index=[0])
+            table_entry2 = pd.DataFrame(data={'Season':date_season, 'League': cur_league, 'GameDay':gameDay, 'rank':0,
+           'Team':team2, 'sp':0, 'g':0, 'u':0, 'v':0, 'tore':0, 'diff':0, 'points':0}, index=[0])
+        
+        # last seasons last gameday entry
+        ls_table_entry1 = allTables[ (allTables["Team"] == team1) & (allTables["Season"] == date_season-1) & (allTables["GameDay"] == 34) ]
+        ls_table_entry2 = allTables[ (allTables["Team"] == team2) & (allTables["Season"] == date_season-1) & (allTables["GameDay"] == 34) ]
+        
+        # last 5 seasons league, 1 if all same as current league, 0 if at least one season was different
+        t1_last5, t2_last5 = 0,0
+        try:
+            if (len(set(_pastLeagues(allTables, team1, date_season))) == 1) & (_pastLeagues(allTables, team1, date_season)[0]==table_entry1["League"].values[0]):
+                t1_last5 = 1
+        except:
+            pass
+        try:
+            if (len(set(_pastLeagues(allTables, team2, date_season))) == 1) & (_pastLeagues(allTables, team2, date_season)[0]==table_entry2["League"].values[0]):
+                t2_last5 = 1
+        except:
+            pass
+            
+        # last season positions, if no table exists, default to 3   
+        try:
+            lsp1 = ls_table_entry1["rank"].values[0]
+        except:
+            lsp2 = 3
+        try:
+            lsp2 = ls_table_entry2["rank"].values[0]
+        except:
+            lsp2 = 3
+        
+        # last season league, if no table exists, default to 3   
+        try:
+            lsl1 = ls_table_entry1["League"].values[0]
+        except:
+            lsl2 = 3
+        try:
+            lsl2 = ls_table_entry2["League"].values[0]
+        except:
+            lsl2 = 3
+            
+        
+        
+        # get if playing in CL or EL in current season
+        t1_cl, t2_cl, t1_el, t2_el = 0,0,0,0
+        if len(allTeamResults[ (allTeamResults["Team"] == build_dfs.getKickerTeamName(team1)) 
+                      & (allTeamResults["Season"] == date_season)
+                      & (allTeamResults["Wettbewerb"] == "CL")  ] ) > 0:
+                t1_cl = 1
+        if len(allTeamResults[ (allTeamResults["Team"] == build_dfs.getKickerTeamName(team2)) 
+                      & (allTeamResults["Season"] == date_season)
+                      & (allTeamResults["Wettbewerb"] == "CL")  ] ) > 0:
+                t2_cl = 1
+        if len(allTeamResults[ (allTeamResults["Team"] == build_dfs.getKickerTeamName(team1)) 
+                      & (allTeamResults["Season"] == date_season)
+                      & (allTeamResults["Wettbewerb"] == "EL")  ] ) > 0:
+                t1_el = 1
+        if len(allTeamResults[ (allTeamResults["Team"] == build_dfs.getKickerTeamName(team2)) 
+                      & (allTeamResults["Season"] == date_season)
+                      & (allTeamResults["Wettbewerb"] == "EL")  ] ) > 0:
+                t2_el = 1
+        
+        # last resort to catch some small errors where team info from previous season is missing
+        if (len(table_entry1) < 1) or (len(table_entry2) < 1):
+            continue
+        
+        # append data to outDF
+        outDF = outDF.append({'Retrieve_Date' : pendulum.now().to_date_string(),
+                              'Game_Date' : pendulum_time.to_date_string(),
+                
+                             "Team1" : team1, 
+                             "Team2" : team2, 
+                             
+                             "CurLeague" : cur_league, # current league
+                             "Result" : result, # Game Endresult
+                             
+                             "Team1_Home" : t1_home, # 1 if Team 1 is Hometeam, else 0
+                             "Team2_Home" : t2_home, # 1 if Team 2 is Hometeam, else 0
+                             
+                             "GameTimeOfDay" : gameTimeMinutes , 
+                             "GameWeekday" : pendulum_time.day_of_week, # Weekday of Game
+                             "GameDay" : gameDay, # GameDay in League
+                             
+                             "GamesSinceLastWin1" : last_game_won1, # No. of games since last won game Team1
+                             "GamesSinceLastWin2" : last_game_won2, # No. of games since last won game Team2
+                             
+                             "TimeSinceLastGame1" : t_diff1, # Time in Hours since last game Team 1
+                             "TimeSinceLastGame2" : t_diff2, # Time in Hours since last game Team 2
+                             
+                             "LastGameOverTime1" : t1_overtime, # Was last game of Team 1 with overtime or penalty shootout
+                             "LastGameOverTime2" : t2_overtime, # Was last game of Team 2 with overtime or penalty shootout
+                             
+                             "TimeSinceLastCoach1" : t1_coach_diff, # Time since Team 1 has current coach (if any)
+                             "TimeSinceLastCoach2" : t2_coach_diff, # Time since Team 2 has current coach (if any)    
+                             
+                             
+                             "CurrentPoints1" : table_entry1["points"].values[0], # current position in league Team 1
+                             "CurrentPoints2" : table_entry2["points"].values[0], # current position in league Team 2                          
+                             
+                             "CurrentPosition1" : table_entry1["rank"].values[0], # current position in league Team 1
+                             "CurrentPosition2" : table_entry2["rank"].values[0], # current position in league Team 2
+                             
+                             "CurrentGoalDif1" : table_entry1["diff"].values[0], # current goal difference Team 1
+                             "CurrentGoalDif2" : table_entry2["diff"].values[0], # current goal difference Team 2
+                             
+                             "CurrentWin1" : table_entry1["g"].values[0], # current wins in season of Team 1
+                             "CurrentDraws1" : table_entry1["u"].values[0], # current draws in season of Team 1
+                             "CurrentLoss1" : table_entry1["v"].values[0], # current losses in season of Team 1
+                             "CurrentWin2" : table_entry2["g"].values[0], # current wins in season of Team 2
+                             "CurrentDraws2" : table_entry2["u"].values[0], # current draws in season of Team 2
+                             "CurrentLoss2": table_entry2["v"].values[0], # current losses in season of Team 2                             
+                                                          
+                             "LastSeasonPosition1" : lsp1 , # last season's final position in league Team 1
+                             "LastSeasonPosition2" : lsp2 , # last season's final position in league Team 2
+                             
+                             "LastSeasonLeague1" : lsl1, # last season league of Team 1
+                             "LastSeasonLeague2" : lsl2, # last season league of Team 2
+                             
+                             "Past5YearsInThisLeague1" : t1_last5, # 1 if Team1 played in same league for past 5 years, else 0
+                             "Past5YearsInThisLeague2" : t2_last5 , # 1 if Team2 played in same league for past 5 years, else 0 
+                             
+                             "LastDirectGame1" : last_direct_1, # Last direct meeting of both teams results (0:0 if none)
+                             "LastDirectGame2" : last_direct_2, # 2nd last direct meeting of both teams results (0:0 if none)
+                             "LastDirectGame3" : last_direct_3, # 3rd last direct meeting of both teams results (0:0 if none)
+                             
+                             "LastDirectGame1_time" : last_direct_1_time, # Time in days since last direct meeting of both teams results (99999 if none)
+                             "LastDirectGame2_time" : last_direct_2_time, # Time in days since 2nd last direct meeting of both teams results (99999 if none)
+                             "LastDirectGame3_time" : last_direct_3_time, # Time in days since 3rd last direct meeting of both teams results (99999 if none)
+                                 
+                             "LastGameTeam1_1" : l5Games1[0], # Last 5 game results of Team 1                                 
+                             "LastGameTeam1_2" : l5Games1[1],
+                             "LastGameTeam1_3" : l5Games1[2],
+                             "LastGameTeam1_4" : l5Games1[3],
+                             "LastGameTeam1_5" : l5Games1[4],
+                             "LastGameTeam2_1" : l5Games2[0], # Last 5 game results of Team 2
+                             "LastGameTeam2_2" : l5Games2[1],
+                             "LastGameTeam2_3" : l5Games2[2],
+                             "LastGameTeam2_4" : l5Games2[3],
+                             "LastGameTeam2_5" : l5Games2[4],
+                             
+                             "CL_candidate1" : t1_cl,  # Team 1 playing Champions League this season
+                             "CL_candidate2" : t2_cl,  # Team 2 playing Champions League this season
+                             
+                             "EL_candidate1" : t1_el,  # Team 1 playing Europe League this season
+                             "EL_candidate2" : t2_el   # Team 2 playing Europe League this season
+                             },
+                    ignore_index=True)
+                                            
+    outDF = build_dfs.switch_teams(outDF)
+    outDF.to_csv(outFile, sep=";", encoding="utf8", index=False)
+
+
+# # # # # # # # # BENCHMARKS # # # # # # # # #
+
+def _timeit(func, *args, **kwargs):
+    """
+    Returns output of func and runtime in seconds
+    """
+    start = time.perf_counter()
+    out = func(*args, **kwargs)
+    return out, time.perf_counter() - start
+
+
+def _gameKey(df):
+    """
+    Key of a game that does not depend on which team is Team1
+    """
+    first = np.where(df["Team1"] < df["Team2"], df["Team1"], df["Team2"])
+    second = np.where(df["Team1"] < df["Team2"], df["Team2"], df["Team1"])
+    return df["Game_Date"] + "|" + first + "|" + second
+
+
+def benchHumanFrame(skip_legacy=False):
+    """
+    Compares build_dfs.createHumanFrame() with createHumanFrameLegacy() on the full history
+    Prints both runtimes, number of games and the share of equal values per column for games found by both
+
+    :skip_legacy: only time the new version (legacy loop takes very long on the full history)
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        new_df, new_time = _timeit(build_dfs.createHumanFrame, outFile=os.path.join(tmp, "new.csv"))
+        print("\nvectorized: {:.1f}s for {} games".format(new_time, len(new_df)))
+
+        if skip_legacy:
+            return
+
+        legacy_file = os.path.join(tmp, "legacy.csv")
+        _, legacy_time = _timeit(createHumanFrameLegacy, outFile=legacy_file)
+        legacy_df = pd.read_csv(legacy_file, sep=";", encoding="utf8")
+        new_df = pd.read_csv(os.path.join(tmp, "new.csv"), sep=";", encoding="utf8")
+        print("\nlegacy:     {:.1f}s for {} games".format(legacy_time, len(legacy_df)))
+        print("speedup:    {:.0f}x".format(legacy_time / new_time))
+
+    # compare values of games found by both versions
+    legacy_df["key"] = _gameKey(legacy_df)
+    new_df["key"] = _gameKey(new_df)
+    both = legacy_df.merge(new_df, on="key", suffixes=("_legacy", "_new"))
+    print("games in both: {}, only legacy: {}, only vectorized: {}".format(
+          len(both), len(legacy_df) - len(both), len(new_df) - len(both)))
+
+    for col in legacy_df.columns:
+        if col in ["key", "Retrieve_Date"]:
+            continue
+        equal = (both[col + "_legacy"].astype(str) == both[col + "_new"].astype(str)).mean()
+        if equal < 1:
+            print("  {:<25} {:.1%} equal".format(col, equal))
+
+
+def benchStorage(csv_folder=None):
+    """
+    Read and write times of the csv files against the parquet store (storage.py) for all tables
+    found in :csv_folder: (defaults to the build_dfs data folder), plus the update of one season partition
+
+    Parquet files are written to a temporary folder, :csv_folder: is not changed
+    """
+    csv_folder = csv_folder if csv_folder is not None else build_dfs.data_context.data_folder
+
+    print("\n{:<16} {:>9} {:>9} {:>9} {:>9} {:>9} {:>9}".format(
+          "table", "csv read", "pq read", "csv wrt", "pq wrt", "csv MB", "pq MB"))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, spec in storage.TABLES.items():
+            csv_file = os.path.join(csv_folder, spec["csv"])
+            if not os.path.exists(csv_file):
+                continue
+
+            df, csv_read = _timeit(pd.read_csv, csv_file, sep=";", encoding="utf8")
+            _, csv_write = _timeit(df.to_csv, os.path.join(tmp, spec["csv"]), sep=";")
+            _, pq_write = _timeit(storage.writeTable, df, name, tmp)
+            typed_df, pq_read = _timeit(storage.readTable, name, tmp)
+
+            pq_size = sum(os.path.getsize(os.path.join(tmp, name, f)) for f in os.listdir(os.path.join(tmp, name)))
+            print("{:<16} {:>8.2f}s {:>8.2f}s {:>8.2f}s {:>8.2f}s {:>9.1f} {:>9.1f}".format(
+                  name, csv_read, pq_read, csv_write, pq_write, os.path.getsize(csv_file) / 1e6, pq_size / 1e6))
+
+            # an update of the last season only rewrites its partition, csv always rewrites the whole file
+            if "Season" in spec["partition"]:
+                last_season = typed_df[typed_df["Season"] == typed_df["Season"].max()]
+                _, pq_update = _timeit(storage.writePartitions, last_season, name, tmp)
+                print("{:<16} update of last season: csv {:.2f}s, parquet {:.2f}s".format("", csv_write, pq_update))
+
+
+def benchMemory(csv_folder=None):
+    """
+    Memory of every table found in :csv_folder: (defaults to the build_dfs data folder) read with default
+    pandas inference against the declared column types of storage.TABLES, plus the columns saving most
+    """
+    csv_folder = csv_folder if csv_folder is not None else build_dfs.data_context.data_folder
+
+    print("\n{:<16} {:>9} {:>9} {:>9} {:>7}".format("table", "rows", "raw MB", "typed MB", "ratio"))
+
+    for name, spec in storage.TABLES.items():
+        csv_file = os.path.join(csv_folder, spec["csv"])
+        if not os.path.exists(csv_file):
+            continue
+
+        raw_df = pd.read_csv(csv_file, sep=";", encoding="utf8")
+        typed_df = storage.typed(raw_df, name)
+        raw_mb, typed_mb = storage.memoryUsage(raw_df), storage.memoryUsage(typed_df)
+        print("{:<16} {:>9} {:>9.1f} {:>9.1f} {:>6.1f}x".format(name, len(raw_df), raw_mb, typed_mb,
+                                                               raw_mb / max(typed_mb, 1e-9)))
+
+        # columns added by typed() (eg parsed goals) count as negative savings
+        saved = (raw_df.memory_usage(index=False, deep=True)
+                 .sub(typed_df.memory_usage(index=False, deep=True), fill_value=0).sort_values(ascending=False))
+        for col, value in saved.head(3).items():
+            print("{:<16}   {:<25} {} -> {}, {:.1f} MB saved".format(
+                  "", col, raw_df[col].dtype if col in raw_df else "-", typed_df[col].dtype, value / 1e6))
+
+
+if __name__ == "__main__":
+
+    benchHumanFrame()
+    benchStorage()
+    benchMemory()
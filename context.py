@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+# lazy access to the data_gathering.py output and alias.json, nothing is read before it is used
+
+import os
+
+import aliases
+import features
+import storage
+
+
+# folder with data_gathering.py output, can be overwritten by environment variable KT_DATA_FOLDER
+DEFAULT_DATA_FOLDER = os.environ.get("KT_DATA_FOLDER", "D:/Stuff/Projects/kicktipp/")
+
+# alias.json is part of the repository
+DEFAULT_ALIAS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alias.json")
+
+
+class DataContext:
+    """
+    Holds the four raw tables, the alias index and the feature pipeline built from them (see features.py).
+    Each one is loaded on first access and then cached, so modules can be imported without reading any file.
+    Tables are read from the parquet store (see storage.py) if it exists in data_folder, from csv otherwise,
+    both with the column types of storage.TABLES
+
+    :data_folder: folder with AllTeamPages.csv, AllTeamResults.csv, AllTables.csv and AllTeamCoaches.csv
+    :alias_file: path to alias.json
+    """
+
+    def __init__(self, data_folder=None, alias_file=None):
+        self.data_folder = data_folder if data_folder is not None else DEFAULT_DATA_FOLDER
+        self.alias_file = alias_file if alias_file is not None else DEFAULT_ALIAS_FILE
+        self._cache = {}
+
+    def _path(self, file_name):
+        return os.path.join(self.data_folder, file_name)
+
+    def _read(self, name):
+        if storage.exists(name, self.data_folder):
+            return storage.readTable(name, self.data_folder)
+        return storage.readCsv(name, self._path(storage.TABLES[name]["csv"]))
+
+    def _get(self, name, loader):
+        if name not in self._cache:
+            self._cache[name] = loader()
+        return self._cache[name]
+
+    def reset(self):
+        """
+        Drop all loaded tables, next access reads them again (eg after data_gathering.updateAll())
+        """
+        self._cache = {}
+
+    @property
+    def allTeamPages(self):
+        return self._get("allTeamPages", lambda: self._read("AllTeamPages"))
+
+    @property
+    def allTeamResults(self):
+        return self._get("allTeamResults", lambda: self._read("AllTeamResults"))
+
+    @property
+    def allTables(self):
+        return self._get("allTables", self._loadTables)
+
+    @property
+    def allCoaches(self):
+        return self._get("allCoaches", lambda: self._read("AllTeamCoaches"))
+
+    @property
+    def alias_index(self):
+        return self._get("alias_index", lambda: aliases.AliasIndex.fromFile(self.alias_file))
+
+    @property
+    def alias_json(self):
+        return self.alias_index.alias_json
+
+    @property
+    def pipeline(self):
+        """
+        features.FeaturePipeline of the raw tables, preprocessed once for all feature frames
+        """
+        return self._get("pipeline", lambda: features.FeaturePipeline(self.allTeamResults, self.allTables,
+                                                                      self.allCoaches, self.alias_index))
+
+    def _loadTables(self):
+        allTables = self._read("AllTables")
+
+        # Dynamo Dresden exsits with 2 different plain names in table; other writing errors fixed as well
+        allTables.replace({'1. FC Dynamo Dresden' : 'Dynamo Dresden',
+                           "LR Ahlen" : 'Rot Weiss Ahlen',
+                           'Arminia Bielefeld (' : 'Arminia Bielefeld'}, inplace = True)
+        return allTables
@@ -23,6 +23,8 @@ If updating exsiting files:
 
 """
 
+import json
+import os
 import requests
 import pandas as pd
 import pendulum
@@ -31,6 +33,206 @@ import re
 from bs4 import BeautifulSoup
 from selenium import webdriver
 
+import fetching
+import storage
+
+
+# output tables: columns and columns that identify a row (keep: which duplicate wins, first = already stored)
+TABLE_SPECS = {
+    "AllTables": {"collist": ['Retrieve_Date', 'Season', 'League', 'GameDay', 
+                              'rank', 'Team', 'sp', 'g', 'u', 'v', 'tore', 'diff', 'points'],
+                  "subset": ['Retrieve_Date', 'Season', 'League', 'GameDay', 
+                             'rank', 'Team', 'sp', 'g', 'u', 'v', 'tore', 'diff'],
+                  "keep": 'first'},
+    "AllTeamPages": {"collist": ['Retrieve_Date', 'Season', 'League', 'Team', 'url_Teamname', 'Team_URL'],
+                     "subset": ['Retrieve_Date', 'Season', 'League', 'Team', 'url_Teamname'],
+                     "keep": 'first'},
+    "AllTeamResults": {"collist": ['Retrieve_Date', 'Team', 'Season', 'Gegner', 'Wettbewerb', 'Spt./Runde', 'Termin', 
+                                   'Wo', 'Score', 'Overtime'],
+                       "subset": ['Termin', 'Team'],
+                       "keep": 'last'},
+    "AllTeamCoaches": {"collist": ['Retrieve_Date', 'Team', "Vorname", "Nachname", "Geboren", "Nationalität",
+                                   "von", "bis"],
+                       "subset": ['Team', 'Vorname', 'Nachname', 'von'],
+                       "keep": 'first'},
+}
+
+
+class ScrapeSession:
+    """
+    Loads each output table once, collects all scraped rows in memory and writes each table once
+    on save() instead of after every gameday, team or coach page
+    
+    Every added row (and every drop) is written to <file>.journal right away. If a run crashes before
+    save(), the journal is replayed the next time the table is loaded, so nothing scraped is lost
+    
+    :files: dict of table name (key of TABLE_SPECS) -> csv file. If the folder of the file holds 
+            a parquet store of the table (see storage.py), that is used instead and only 
+            changed partitions are rewritten
+    :checkpoint: if set, save() is called automatically after this many added rows
+    """
+    
+    def __init__(self, files, checkpoint=None):
+        self.files = files
+        self.checkpoint = checkpoint
+        self._frames = {}
+        self._pending = {}
+        self._touched = {}
+        self._since_save = 0
+    
+    def _folder(self, name):
+        return os.path.dirname(os.path.abspath(self.files[name]))
+    
+    def _isStore(self, name):
+        return storage.exists(name, self._folder(name))
+    
+    def _journal(self, name):
+        return self.files[name] + ".journal"
+    
+    def _load(self, name):
+        """
+        Read table once, replay journal of a crashed run
+        """
+        if name in self._frames:
+            return
+        
+        collist = TABLE_SPECS[name]["collist"]
+        if self._isStore(name):
+            outDF = storage.readTable(name, self._folder(name))
+        else:
+            try:
+                outDF = pd.read_csv(self.files[name], sep=";", encoding="utf8")
+            except:
+                outDF = pd.DataFrame(columns=collist)
+        
+        self._frames[name] = outDF
+        self._pending[name] = []
+        self._touched[name] = set()
+        
+        if os.path.exists(self._journal(name)):
+            with open(self._journal(name), "r", encoding="utf8") as j:
+                entries = [json.loads(line) for line in j if line.strip() != ""]
+            for entry in entries:
+                if "drop" in entry:
+                    self._drop(name, entry["drop"])
+                else:
+                    self._pending[name].append(entry["row"])
+                    self._touch(name, entry["row"])
+            print(len(entries), "journaled entries of", name, "recovered")
+    
+    def _writeJournal(self, name, entries):
+        with open(self._journal(name), "a", encoding="utf8") as j:
+            for entry in entries:
+                # numpy values are not json serializable
+                j.write(json.dumps(entry, default=lambda v: v.item() if hasattr(v, "item") else str(v)) + "\n")
+    
+    def _touch(self, name, match):
+        """
+        Remember partitions of the parquet store that need to be rewritten
+        """
+        partition = storage.TABLES[name]["partition"]
+        # None: whole table is rewritten (also for tables without partition columns)
+        if len(partition) > 0 and all(col in match for col in partition):
+            self._touched[name].add(tuple(int(match[col]) for col in partition))
+        else:
+            self._touched[name].add(None)
+    
+    def _drop(self, name, match):
+        outDF = self._frames[name]
+        mask = pd.Series(True, index=outDF.index)
+        for col, val in match.items():
+            mask &= outDF[col] == val
+        self._frames[name] = outDF[~mask]
+        self._pending[name] = [row for row in self._pending[name] 
+                               if not all(row.get(col) == val for col, val in match.items())]
+        self._touch(name, match)
+    
+    def contains(self, name, **match):
+        """
+        True if table :name: (stored or pending rows) has a row with all column values of :match:
+        """
+        self._load(name)
+        outDF = self._frames[name]
+        mask = pd.Series(True, index=outDF.index)
+        for col, val in match.items():
+            mask &= outDF[col] == val
+        if mask.any():
+            return True
+        return any(all(row.get(col) == val for col, val in match.items()) for row in self._pending[name])
+    
+    def table(self, name):
+        """
+        Returns table :name: including pending rows
+        """
+        self._load(name)
+        return pd.concat([self._frames[name], pd.DataFrame(self._pending[name])], ignore_index=True)
+    
+    def add(self, name, rows):
+        """
+        Add list of row dicts (or DataFrame) to table :name:
+        """
+        self._load(name)
+        if isinstance(rows, pd.DataFrame):
+            rows = rows.to_dict("records")
+        
+        self._writeJournal(name, [{"row": row} for row in rows])
+        for row in rows:
+            self._pending[name].append(row)
+            self._touch(name, row)
+        
+        self._since_save += len(rows)
+        if self.checkpoint is not None and self._since_save >= self.checkpoint:
+            self.save()
+    
+    def drop(self, name, **match):
+        """
+        Remove all rows of table :name: with all column values of :match:, eg. before refetching them
+        """
+        self._load(name)
+        self._writeJournal(name, [{"drop": match}])
+        self._drop(name, match)
+    
+    def save(self):
+        """
+        Deduplicate and write every changed table once, then clear the journals
+        """
+        for name in list(self._pending):
+            if len(self._pending[name]) == 0 and len(self._touched[name]) == 0:
+                continue
+            
+            spec = TABLE_SPECS[name]
+            newDF = pd.DataFrame(self._pending[name], columns=spec["collist"])
+            if self._isStore(name):
+                # same column types as stored rows, else duplicates are not found
+                newDF = storage.typed(newDF, name)
+            outDF = pd.concat([self._frames[name], newDF], ignore_index=True)
+            
+            # cut off not needed columns (drops not needed index columns), drop duplicates of double fetched data
+            outDF = outDF[spec["collist"]]
+            outDF = outDF.drop_duplicates(subset=spec["subset"], keep=spec["keep"])
+            
+            if self._isStore(name):
+                partition = storage.TABLES[name]["partition"]
+                if len(partition) == 0 or None in self._touched[name]:
+                    storage.writeTable(outDF, name, self._folder(name))
+                else:
+                    keys = pd.MultiIndex.from_frame(outDF[partition].astype(int))
+                    changed = outDF[keys.isin(list(self._touched[name]))]
+                    storage.writePartitions(changed, name, self._folder(name))
+            else:
+                outDF.to_csv(self.files[name] + ".tmp", sep=";")
+                os.replace(self.files[name] + ".tmp", self.files[name])
+            
+            self._frames[name] = outDF
+            self._pending[name] = []
+            self._touched[name] = set()
+            if os.path.exists(self._journal(name)):
+                os.remove(self._journal(name))
+            
+            print(name, "saved")
+        
+        self._since_save = 0
+
 
 # Part 1 - Get historic data using openligadb.de
 def getUrl(url):
@@ -83,57 +285,93 @@ def getCurrentSeason():
     return cur_season
 
 
-def getTableFromKicker(season, league, gameday, tableCSV, force = False, driver=None):
+# # # # # # # # # URLS AND PARSERS # # # # # # # # #
+# parsers only need the html of a page, so it can be fetched by a driver, a fetching.FetchPool or read from elsewhere
+
+def tableUrl(season, league, gameday):
     """
-    Build a DF for each GameDay's table
-    
-    :season: int of season, eg 16 is season 2016/17
-    :league: league to query, tested: 1, 2
-    
-    :gameCSV: :tableCSV: csv files to store final data in
-    
-    :output: "AllTables.csv"
-    
-    :force: reload table even if it already exists
+    kicker url of the table after :gameday:
     """
+    return "http://www.kicker.de/news/fussball/bundesliga/spieltag/{}-bundesliga/20{}-{}/{}/0/spieltag.html".format(
+                league, fix_season(season), fix_season(season+1), gameday)
+
+
+def teamResultsUrl(rec_url, season):
+    """
+    rebuild vereinstermine url :rec_url: of a team for :season:
+    """
+    split_url = rec_url.split('/')
+    split_url[8] = "20" + str(fix_season(season)) + "-" + str(fix_season(season+1))
+    return "/".join(split_url)
+
+
+def teamPageUrl(team_url, page):
+    """
+    urls in AllTeamPages end in vereinsinformationen.html, replace by :page: (eg "vereinstermine.html")
+    """
+    url_split = team_url.split("/")
+    url_split[-1] = page
+    return "/".join(url_split)
+
+
+def pageSource(url, driver=None, pages=None):
+    """
+    Returns html of :url:, taken from :pages: (dict url -> html, eg fetching.FetchPool.fetchAll() output)
+    if it was fetched there, loaded with :driver: otherwise
+    """
+    if pages is not None and pages.get(url) is not None:
+        return pages[url]
     
-    # prepare/load outout DF
-    collist = ['Retrieve_Date', 'Season', 'League', 'GameDay', 
-               'rank', 'Team', 'sp', 'g', 'u', 'v', 'tore', 'diff', 'points']
+    # page could not be fetched and no browser to try again, parsers find nothing in an empty page
+    if driver is None:
+        return ""
+    
+    # try reloading after timeout
     try:
-        outDF = pd.read_csv(tableCSV, sep=";", encoding="utf8")
+        driver.get(url) 
     except:
-        outDF = pd.DataFrame(columns=collist)
-    
-    # check if specific season, league, gameday combination is already in list and skip if so
-    if force == False:
-        if len(outDF[ (outDF['Season'] == season) & (outDF['League'] == league) & (outDF['GameDay'] == gameday)]) > 0:
-            print("Season ", season, "League ", league, "Gameday ", gameday, "  skipped")
-            return
-    
-    
-    #options = webdriver.firefox.options.Options()
-    #options.add_argument('-headless')
-    #driver = webdriver.Firefox(firefox_options=options)
+        driver.get(url)
+    return driver.page_source
+
+
+# content placeholder of server rendered kicker pages, pages rendered by JavaScript don't have it
+PAGE_CONTENT = re.compile(r"^ctl00_PlaceHolderContent")
+
+
+def pageParsable(url, html):
+    """
+    True if :html: contains the element the parser of the page type of :url: is looking for
+    Pages without it are fetched again with a browser (see fetching.AsyncFetcher)
     
-    driver.get("http://www.kicker.de/news/fussball/bundesliga/spieltag/{}-bundesliga/20{}-{}/{}/0/spieltag.html".format(
-                league, fix_season(season), fix_season(season+1), gameday)) 
-    blankHTML = driver.page_source
-    soup = BeautifulSoup(blankHTML, "lxml") 
+    Spieltag pages of gamedays not played yet have no table, they are parsable if the page content 
+    was rendered (parseTable() returns None for them)
+    """
+    soup = BeautifulSoup(html, "lxml")
+    if url.endswith("trainer.html"):
+        return soup.find("div", {"id" : "slidercontainer"}) is not None
+    if soup.find("table", {"summary" : 'Tabelle', "class" : 'tStat'}) is not None:
+        return True
+    return url.endswith("spieltag.html") and soup.find(id=PAGE_CONTENT) is not None
 
-    # find table element, return doing nothing if no data was found (eg gameday not played yet)
+
+def parseTable(html, season, league, gameday):
+    """
+    Returns rows of AllTables from the html of a kicker spieltag page, None if the page has no table
+    (eg gameday not played yet)
+    """
+    soup = BeautifulSoup(html, "lxml") 
+
+    # find table element
     table = soup.find("table", {"summary" : 'Tabelle', "class" : 'tStat'})
-    
-    # if no table exisits on the site, gameday has not been played
     if table is None:
-        print("Gameday ", gameday, " doesn't exist, ending")
-        return
+        return None
     
     try:
         table_entries = table.find_all("td", {"class" : 'first'})
     except:
-        return
+        return None
     
+    rows = []
     for rank, team in enumerate(table_entries):
         team_entries = [i for i in team.next_siblings]        
         
@@ -168,26 +406,202 @@ def getTableFromKicker(season, league, gameday, tableCSV, force = False, driver=
                 team = team[:-2]
 
 
-        outDF = outDF.append({'Retrieve_Date' :  pendulum.now().to_date_string(),
-                              'Season' : season, 
-                              'League' : league, 
-                              'GameDay' : gameday,
-                              'rank' : rank+1, 
-                              'Team' : team, 
-                              'sp' : sp, 
-                              'g' : g, 'u' : u, 'v' : v, 
-                              'tore' : tore, 
-                              'diff' : diff, 
-                              'points' : points}, 
-                              ignore_index=True)
+        rows.append({'Retrieve_Date' :  pendulum.now().to_date_string(),
+                     'Season' : season, 
+                     'League' : league, 
+                     'GameDay' : gameday,
+                     'rank' : rank+1, 
+                     'Team' : team, 
+                     'sp' : sp, 
+                     'g' : g, 'u' : u, 'v' : v, 
+                     'tore' : tore, 
+                     'diff' : diff, 
+                     'points' : points})
+    
+    return rows
+
+
+def parseTeamPages(html, season, league):
+    """
+    Returns rows of AllTeamPages (teams and their kicker urls) from the html of a kicker spieltag page, 
+    None if the page has no table
+    """
+    soup = BeautifulSoup(html, "lxml") 
+    
+    # find table element
+    table = soup.find("table", {"summary" : 'Tabelle', "class" : 'tStat'})
+    try:
+        table_entries = table.find_all("td", {"class" : 'first'})
+    except:
+        return None
+    
+    rows = []
+    for team in table_entries:
+        team_entries = [i for i in team.next_siblings]  
+        
+        alltag = team_entries[3].find("div", {"id" : re.compile("ctl00_PlaceHolderContent_tabelle_ctl\d\d_repTabelle_ctl\d\d_ctl\d\d_verlinkt")})
+                                                     
+        specURL = alltag.next.next.next.next.next['href']
+
+        url = "http://www.kicker.de" + specURL
+        
+        urlTeamName = specURL.split("/")[-2]
+        
+        team = team_entries[3].text.strip()
+        for qualifier in ['(N)', '(M)', '(P)', '(A)']:
+            if qualifier in team:
+                team = team[:-4]
+        if '(M, P)' in team:
+                team = team[:-7]
+        
+        rows.append({'Retrieve_Date' :  pendulum.now().to_date_string(),
+                     'Season' : season, 
+                     'League' : league, 
+                     'Team' : team,
+                     'url_Teamname' : urlTeamName,
+                     'Team_URL' : url})
+    
+    return rows
+
+
+def parseTeamResults(html, team, season):
+    """
+    Returns AllTeamResults rows (DataFrame) from the html of a kicker vereinstermine page, 
+    None if the page has no results table
+    """
+    soup = BeautifulSoup(html, "lxml") 
+    
+    # locate table in html code, read html table with pandas
+    table = soup.find("table", {"class" : "tStat", "summary" : "Tabelle"})
+    if table is None:
+        return None
+    pdTable = pd.read_html(str(table), header=0)[0]
+    
+    # clean up table
+    pdTable = pdTable.iloc[ : , 0:6]
+    try:
+        pdTable.dropna(subset=["Gegner"], inplace=True)
+    except:
+        return None
+    
+    # ffill missing Wettbewerb data
+    pdTable = pdTable.fillna(method='ffill')
+    
+    # get a clean column with final result
+    pdTable["Score"] = pdTable.apply(lambda row: getScore(row['i']), axis=1)
+    
+    # get a column indicating if game was n.V. or i.E.
+    pdTable["Overtime"] = pdTable.apply(lambda row: getOvertime(row['i']), axis=1)
+    
+    # delete obsolete orignal results column, labeled i 
+    pdTable.drop(["i"], axis=1, inplace=True)
+    
+    # retrieval date column added
+    pdTable['Retrieve_Date'] = pendulum.now().to_date_string()
+    pdTable['Team'] = team
+    pdTable['Season'] = season
+    
+    pdTable = pdTable.rename(columns={"Ergebnis":"Wo"})
+    
+    return pdTable[TABLE_SPECS["AllTeamResults"]["collist"]]
 
+
+def parseCoaches(html, team):
+    """
+    Returns AllTeamCoaches rows from the html of a kicker trainer page, None if the page has no coaches
+    """
+    soup = BeautifulSoup(html, "lxml") 
+    
+    # find main container with all coaches in it
+    main_container = soup.find("div", {"id" : "slidercontainer"})
+    
+    try:
+        # get one container per coach
+        coaches = main_container.find_all("div", {"class" : "trainerverlauf_Container"})
+    except:
+        return None
+    
+    # get first part with coach general data
+    rows = []
+    for c in coaches:
+        coach_cv = c.find_all("tbody")[0]
+        coach_cv_subs = coach_cv.find_all("tr")
         
-    # cut off not needed columns (drops not needed index columns)
-    outDF = outDF[collist]    
-    # drop duplicates in case of double fetched data - dont use GoalsList col, as lists are not supported for drop_duplicates
-    outDF.drop_duplicates(subset=collist[:-1], inplace=True)
+        for entry in coach_cv_subs:
+            if 'Vorname' in entry.text:
+                vorname = entry.text[entry.text.find(":") + 1: ]
+            if 'Nachname' in entry.text:
+                nachname = entry.text[entry.text.find(":") + 1: ]
+            if 'Geboren' in entry.text:
+                geboren = entry.text[entry.text.find(":") + 1: ].strip()
+            if 'Nation' in entry.text:
+                nation = entry.text[entry.text.find(":") + 1: ]
+            if 'von:' in entry.text:
+                von = entry.text[entry.text.find(":") + 1 : entry.text.rfind(",")]
+            if 'bis:' in entry.text:
+                if "," in entry.text:
+                    bis = entry.text[entry.text.find(":") + 1 : entry.text.rfind(",")]
+                else:
+                    bis = entry.text[entry.text.find(":") + 1 : ]
+            
+        rows.append({'Retrieve_Date' :  pendulum.now().to_date_string(),
+                     'Team' : team, 
+                     "Vorname" : vorname, 
+                     "Nachname" : nachname, 
+                     "Geboren" : geboren, 
+                     "Nationalität" : nation,
+                     "von" : von, 
+                     "bis" : bis})
+    
+    return rows
+
+
+def getTableFromKicker(season, league, gameday, tableCSV, force = False, driver=None, session=None, pages=None):
+    """
+    Build a DF for each GameDay's table
+    
+    :season: int of season, eg 16 is season 2016/17
+    :league: league to query, tested: 1, 2
+    
+    :gameCSV: :tableCSV: csv files to store final data in
+    
+    :output: "AllTables.csv"
+    
+    :force: reload table even if it already exists, stored rows of the gameday are replaced
+    :session: ScrapeSession collecting the rows, if None rows are written to tableCSV at the end of the call
+    :pages: dict url -> html of already fetched pages (see fetching.FetchPool), driver is only used for missing ones
+    """
+    
+    # prepare/load outout DF
+    own_session = session is None
+    if own_session:
+        session = ScrapeSession({"AllTables" : tableCSV})
+    
+    # check if specific season, league, gameday combination is already in list and skip if so
+    if force == False:
+        if session.contains("AllTables", Season=season, League=league, GameDay=gameday):
+            print("Season ", season, "League ", league, "Gameday ", gameday, "  skipped")
+            return
+    
+    
+    #options = webdriver.firefox.options.Options()
+    #options.add_argument('-headless')
+    #driver = webdriver.Firefox(firefox_options=options)
     
-    outDF.to_csv(tableCSV, sep=";")
+    blankHTML = pageSource(tableUrl(season, league, gameday), driver, pages)
+    rows = parseTable(blankHTML, season, league, gameday)
+    
+    # if no table exisits on the site, gameday has not been played
+    if rows is None:
+        print("Gameday ", gameday, " doesn't exist, ending")
+        return
+    
+    # duplicates are dropped by the session when saving
+    if force:
+        session.drop("AllTables", Season=season, League=league, GameDay=gameday)
+    session.add("AllTables", rows)
+    if own_session:
+        session.save()
     
     print("Season ", season, "League ", league, "Gameday ", gameday, "  done")
     
@@ -195,86 +609,84 @@ def getTableFromKicker(season, league, gameday, tableCSV, force = False, driver=
 
 
 
-def getAllTeamPages(inCsvFile, driver=None):
+def finalGameDays(tables, teams=18):
+    """
+    Returns set of gamedays whose table in :tables: (AllTables rows of one season and league) is final: 
+    all :teams: are listed and every team has played as many games as the gameday number, so no game 
+    of the gameday or before is still missing (eg postponed games)
+    """
+    if len(tables) == 0:
+        return set()
+    
+    tables = tables.assign(done = pd.to_numeric(tables["sp"]) == pd.to_numeric(tables["GameDay"]))
+    per_gameday = tables.groupby("GameDay").agg(teams=("Team", "nunique"), done=("done", "all"))
+    final = per_gameday[(per_gameday["teams"] >= teams) & per_gameday["done"]]
+    return set(int(g) for g in final.index)
+
+
+def gameDaysToFetch(tables, upper_boundary, current, recheck_gamedays=4):
+    """
+    Returns list of gamedays up to :upper_boundary: whose table has to be fetched: gamedays missing in
+    :tables: (AllTables rows of one season and league) and not final ones (see finalGameDays())
+    
+    A gameday with a postponed game stays not final until the game is played, so stored tables more than
+    :recheck_gamedays: gamedays before :current: (last played gameday) are not fetched again
+    """
+    final = finalGameDays(tables)
+    stored = set(pd.to_numeric(tables["GameDay"]).astype(int))
+    return [g for g in range(1, upper_boundary + 1) 
+            if g not in final and (g not in stored or g >= current - recheck_gamedays)]
+
+
+def getAllTeamPages(inCsvFile, driver=None, session=None, pool=None):
     """
     Get a list and current kicker urls of all teams in league 1 and 2 since 2004
     
     output: "AllTeamPages.csv"
+    
+    :session: ScrapeSession collecting the rows, if None rows are written to inCsvFile at the end of the call
+    :pool: fetching.FetchPool or fetching.AsyncFetcher, if passed all pages are fetched in parallel first,
+           no browser is started then
     """
     
     # get curren season
     cur_season = getCurrentSeason()       
     
     # prepare/load outout DF
-    collist = ['Retrieve_Date', 'Season', 'League', 'Team', 'url_Teamname', 'Team_URL']
-    try:
-        outDF = pd.read_csv(inCsvFile, sep=";", encoding="utf8")
-    except:
-        outDF = pd.DataFrame(columns=collist)
-    
-    
-    options = webdriver.firefox.options.Options()
-    options.add_argument('-headless')
-    driver = webdriver.Firefox(firefox_options=options)
+    own_session = session is None
+    if own_session:
+        session = ScrapeSession({"AllTeamPages" : inCsvFile})
     
+    # check if specific season, league combination is already in list and skip if so
+    todo = []
     for league in range(1,3):
         for season in range(4, cur_season+1):
-                
-            # check if specific season, league, gameday combination is already in list and skip if so
-            if len(outDF[ (outDF['Season'] == season) & (outDF['League'] == league)]) > 0:
+            if session.contains("AllTeamPages", Season=season, League=league):
                 print("Season ", season, "League ", league, "  skipped")
-                continue
-            
+            else:
+                todo.append((league, season))
     
-            driver.get("http://www.kicker.de/news/fussball/bundesliga/spieltag/{}-bundesliga/20{}-{}/{}/0/spieltag.html".format(
-                       league, fix_season(season), fix_season(season+1), 1)) 
-            blankHTML = driver.page_source
-            soup = BeautifulSoup(blankHTML, "lxml") 
-            
-            # find table element, return doing nothing if no data was found (eg gameday not played yet)
-            table = soup.find("table", {"summary" : 'Tabelle', "class" : 'tStat'})
-            try:
-                table_entries = table.find_all("td", {"class" : 'first'})
-            except:
-                return
-            
-            for team in table_entries:
-                team_entries = [i for i in team.next_siblings]  
-                
-                alltag = team_entries[3].find("div", {"id" : re.compile("ctl00_PlaceHolderContent_tabelle_ctl\d\d_repTabelle_ctl\d\d_ctl\d\d_verlinkt")})
-                                                             
-                specURL = alltag.next.next.next.next.next['href']
-
-                url = "http://www.kicker.de" + specURL
-                
-                urlTeamName = specURL.split("/")[-2]
-                
-                team = team_entries[3].text.strip()
-                for qualifier in ['(N)', '(M)', '(P)', '(A)']:
-                    if qualifier in team:
-                        team = team[:-4]
-                if '(M, P)' in team:
-                        team = team[:-7]
-                        
-                
-            
-                outDF = outDF.append({'Retrieve_Date' :  pendulum.now().to_date_string(),
-                                      'Season' : season, 
-                                      'League' : league, 
-                                      'Team' : team,
-                                      'url_Teamname' : urlTeamName,
-                                      'Team_URL' : url}, 
-                                      ignore_index=True)
-
+    if pool is not None:
+        pages = pool.fetchAll([tableUrl(season, league, 1) for league, season in todo])
+    else:
+        pages = None
+        if driver is None:
+            options = webdriver.firefox.options.Options()
+            options.add_argument('-headless')
+            driver = webdriver.Firefox(firefox_options=options)
+    
+    for league, season in todo:
+        rows = parseTeamPages(pageSource(tableUrl(season, league, 1), driver, pages), season, league)
+        
+        # return doing nothing if no data was found (eg gameday not played yet)
+        if rows is None:
+            break
+        
+        session.add("AllTeamPages", rows)
+        print("Season ", season, "League ", league, len(rows), " Teams done")
     
-                print("Season ", season, "League ", league, "Team ", team, "  done")
-                
-            # cut off not needed columns (drops not needed index columns)
-            outDF = outDF[collist]    
-            # drop duplicates in case of double fetched data - dont use GoalsList col, as lists are not supported for drop_duplicates
-            outDF.drop_duplicates(subset=collist[:-1], inplace=True)
-            
-            outDF.to_csv(inCsvFile, sep=";") 
+    if own_session:
+        session.save()
     
     #driver.close()
 
@@ -306,7 +718,7 @@ def getOvertime(entry):
         return 0
 
 
-def getTeamResults(inCsvFile, mode = 'u', rec_url = None, driver=None):
+def getTeamResults(inCsvFile, mode = 'u', rec_url = None, driver=None, session=None, pages=None):
     """
     Get ALL games of a team by season, go back until season 2004
     
@@ -314,165 +726,96 @@ def getTeamResults(inCsvFile, mode = 'u', rec_url = None, driver=None):
     :mode: 'u' (default) will only update missing data from current season
            'a' will fetch All data back until 2004 (should only use for initial build of file)
     :rec_url: is the most recent url, data from this will be used to update missing or go back to 2004 from
+    :session: ScrapeSession collecting the rows, if None rows are written to inCsvFile at the end of the call
+    :pages: dict url -> html of already fetched pages (see fetching.FetchPool), driver is only used for missing ones
     """
     
     # get curren season
     cur_season = getCurrentSeason()  
     
     # prepare/load outout DF
-    collist = ['Retrieve_Date', 'Team', 'Season', 'Gegner', 'Wettbewerb', 'Spt./Runde', 'Termin', 'Wo', 'Score',
-       'Overtime']
-    try:
-        outDF = pd.read_csv(inCsvFile, sep=";", encoding="utf8")
-    except:
-        outDF = pd.DataFrame(columns=collist)
+    own_session = session is None
+    if own_session:
+        session = ScrapeSession({"AllTeamResults" : inCsvFile})
     
     #options = webdriver.firefox.options.Options()
     #options.add_argument('-headless')
     #driver = webdriver.Firefox(firefox_options=options)
     
-    driver.set_page_load_timeout(60)
+    if driver is not None:
+        driver.set_page_load_timeout(60)
 
     #recent_url = "http://www.kicker.de/news/fussball/bundesliga/vereine/1-bundesliga/2018-19/borussia-dortmund-17/vereinstermine.html"
     # extract recent season from rec_url
     rec_season = rec_url.split('/')[8][2:4]
+    team = rec_url.split('/')[-2]
     
     if mode == 'a':
         
         # work backwards through seasons, until 2004
         for i in range(int(rec_season), 3, -1):
-                        
-            # rebuild rec_url for each iteration with correct season
-            split_url = rec_url.split('/')
-            split_url[8] = "20" + str(fix_season(i)) + "-" + str(fix_season(i+1))
-            url = "/".join(split_url)
             
             # skip season/team if already in list
-            if  len(outDF[ (outDF['Season'] == i) & (outDF['Team'] == split_url[-2])]) > 0:
-                print("skipping ",  split_url[-2], " season ", i)
+            if session.contains("AllTeamResults", Season=i, Team=team):
+                print("skipping ",  team, " season ", i)
                 continue
             
-            # try reloading after timeout
-            try:
-                driver.get(url) 
-            except:
-                driver.get(url)
-            blankHTML = driver.page_source
-            soup = BeautifulSoup(blankHTML, "lxml") 
-            
-            # ocate table in html code, read html table with pandas
-            table = soup.find("table", {"class" : "tStat", "summary" : "Tabelle"})
-            pdTable = pd.read_html(str(table), header=0)[0]
-            
-            # clean up table
-            pdTable = pdTable.iloc[ : , 0:6]
-            try:
-                pdTable.dropna(subset=["Gegner"], inplace=True)
-            except:
+            # rebuild rec_url for each iteration with correct season
+            blankHTML = pageSource(teamResultsUrl(rec_url, i), driver, pages)
+            pdTable = parseTeamResults(blankHTML, team, i)
+            if pdTable is None:
                 continue
             
-            # ffill missing Wettbewerb data
-            pdTable = pdTable.fillna(method='ffill')
-            
-            # get a clean column with final result
-            pdTable["Score"] = pdTable.apply(lambda row: getScore(row['i']), axis=1)
-            
-            # get a column indicating if game was n.V. or i.E.
-            pdTable["Overtime"] = pdTable.apply(lambda row: getOvertime(row['i']), axis=1)
-            
-            # delete obsolete orignal results column, labeled i 
-            pdTable.drop(["i"], axis=1, inplace=True)
-            
-            # retrieval date column added
-            pdTable['Retrieve_Date'] = pendulum.now().to_date_string()
-            pdTable['Team'] = split_url[-2]
-            pdTable['Season'] = i
-            
-            pdTable = pdTable.rename(columns={"Ergebnis":"Wo"})
-            
-            # append table
-            outDF = outDF.append(pdTable, ignore_index=True)
-            
-            # drop duplicates, determined by date, when in doubt keep later crawled
-            outDF.drop_duplicates(subset=['Termin', 'Team'], keep='last', inplace=True)
-            
-            outDF = outDF[collist]
+            # append table, duplicates (determined by date) are dropped by the session keeping the later crawled
+            session.add("AllTeamResults", pdTable)
             
-            outDF.to_csv(inCsvFile, sep=";") 
-            print("Season ", i, " Team ", split_url[-2], " done")
+            print("Season ", i, " Team ", team, " done")
     
     
     elif mode == 'u':
-        split_url = rec_url.split('/')
-        url = rec_url
-        team = split_url[-2]
+        blankHTML = pageSource(rec_url, driver, pages)
+        pdTable = parseTeamResults(blankHTML, team, cur_season)
         
-        
-        # remove all data from current season and team
-        outDF = outDF[ ~((outDF["Season"] == cur_season) & (outDF["Team"] == team)) ] 
-                
-        # try reloading after timeout
-        try:
-            driver.get(url) 
-        except:
-            driver.get(url)
-        blankHTML = driver.page_source
-        soup = BeautifulSoup(blankHTML, "lxml") 
-        
-        # ocate table in html code, read html table with pandas
-        table = soup.find("table", {"class" : "tStat", "summary" : "Tabelle"})
-        pdTable = pd.read_html(str(table), header=0)[0]
-        
-        # clean up table
-        pdTable = pdTable.iloc[ : , 0:6]
-        try:
-            pdTable.dropna(subset=["Gegner"], inplace=True)
-        except:
-            return
-        
-        # ffill missing Wettbewerb data
-        pdTable = pdTable.fillna(method='ffill')
-        
-        # get a clean column with final result
-        pdTable["Score"] = pdTable.apply(lambda row: getScore(row['i']), axis=1)
-        
-        # get a column indicating if game was n.V. or i.E.
-        pdTable["Overtime"] = pdTable.apply(lambda row: getOvertime(row['i']), axis=1)
-        
-        # delete obsolete orignal results column, labeled i 
-        pdTable.drop(["i"], axis=1, inplace=True)
-        
-        # retrieval date column added
-        pdTable['Retrieve_Date'] = pendulum.now().to_date_string()
-        pdTable['Team'] = split_url[-2]
-        pdTable['Season'] = cur_season
-        
-        pdTable = pdTable.rename(columns={"Ergebnis":"Wo"})
-        
-        # append table
-        outDF = outDF.append(pdTable, ignore_index=True)
-        
-        # drop duplicates, determined by date, when in doubt keep later crawled
-        outDF.drop_duplicates(subset=['Termin', 'Team'], keep='last', inplace=True)
-        
-        outDF = outDF[collist]
-        
-        outDF.to_csv(inCsvFile, sep=";") 
-        print("Season ", cur_season, " Team ", split_url[-2], " updated")
+        if pdTable is not None:
+            # remove all data from current season and team, then append table
+            session.drop("AllTeamResults", Season=cur_season, Team=team)
+            session.add("AllTeamResults", pdTable)
+            
+            print("Season ", cur_season, " Team ", team, " updated")
 
+    if own_session:
+        session.save()
     
     #driver.close()
 
 
 
-def teamResultsBuilder(teamListcsv="AllTeamPages.csv", mode = 'u', outCsv="AllTeamResults.csv", driver=None):
+def _teamList(session, teamListcsv):
+    """
+    AllTeamPages rows including the not yet saved ones of :session:, read from the parquet store next to
+    :teamListcsv: if there is one (its csv file is not updated anymore then)
+    """
+    session.files.setdefault("AllTeamPages", teamListcsv)
+    return session.table("AllTeamPages")
+
+
+def teamResultsBuilder(teamListcsv="AllTeamPages.csv", mode = 'u', outCsv="AllTeamResults.csv", driver=None, session=None,
+                       pool=None):
     """
     Build a teamresults.csv using getTeamResults() for all teams from getAllTeamPages() output
     
     output: "AllTeamResults.csv"
+    
+    :session: ScrapeSession collecting the rows of all teams, if None rows are written to outCsv once at the end
+    :pool: fetching.FetchPool or fetching.AsyncFetcher, if passed all pages are fetched in parallel first,
+           driver is only used for pages the pool failed to fetch
     """
     
-    teamList = pd.read_csv(teamListcsv, sep=";")
+    own_session = session is None
+    if own_session:
+        session = ScrapeSession({"AllTeamResults" : outCsv})
+    
+    teamList = _teamList(session, teamListcsv)
     
     cur_season = getCurrentSeason() 
     
@@ -481,27 +824,32 @@ def teamResultsBuilder(teamListcsv="AllTeamPages.csv", mode = 'u', outCsv="AllTe
         teamList.sort_values("Season", ascending=False, inplace=True)
         single_list = teamList.drop_duplicates("Team")
         
-        for url in single_list["Team_URL"]:
-            # urls must end in vereinstermine.html, currently ending in vereinsinformationen.html
-            url_split = url.split("/")
-            url_split[-1] =  "vereinstermine.html"
-            url = "/".join(url_split)
-            
-            
-            getTeamResults(outCsv, mode = 'a', rec_url = url, driver=driver)
+        # urls must end in vereinstermine.html, currently ending in vereinsinformationen.html
+        url_list = [teamPageUrl(url, "vereinstermine.html") for url in single_list["Team_URL"]]
+        
+        pages = None
+        if pool is not None:
+            # all missing seasons of all teams
+            pages = pool.fetchAll([teamResultsUrl(url, i) for url in url_list 
+                                   for i in range(int(url.split('/')[8][2:4]), 3, -1)
+                                   if not session.contains("AllTeamResults", Season=i, Team=url.split('/')[-2])])
+        
+        for url in url_list:
+            getTeamResults(outCsv, mode = 'a', rec_url = url, driver=driver, session=session, pages=pages)
     
     elif mode == 'u':
         # will effectivly delete present entry for club and season, fetch it again and append new data
         teamList_current = teamList[teamList['Season'] == cur_season]
+        
+        # urls must end in vereinstermine.html, currently ending in vereinsinformationen.html
+        url_list = [teamPageUrl(url, "vereinstermine.html") for url in teamList_current["Team_URL"]]
+        pages = pool.fetchAll(url_list) if pool is not None else None
     
-        for url in teamList_current["Team_URL"]:
-            # urls must end in vereinstermine.html, currently ending in vereinsinformationen.html
-            url_split = url.split("/")
-            url_split[-1] =  "vereinstermine.html"
-            url = "/".join(url_split)
-            
-            
-            getTeamResults(outCsv, mode = 'u', rec_url = url, driver=driver)
+        for url in url_list:
+            getTeamResults(outCsv, mode = 'u', rec_url = url, driver=driver, session=session, pages=pages)
+    
+    if own_session:
+        session.save()
 
 
 
@@ -534,7 +882,8 @@ def getCurrentList(in_urls):
         
 
 
-def getCoaches(teamListcsv="AllTeamPages.csv", mode = "u", outCsv = "AllTeamCoaches.csv", driver=None):
+def getCoaches(teamListcsv="AllTeamPages.csv", mode = "u", outCsv = "AllTeamCoaches.csv", driver=None, session=None,
+               pool=None):
     """
     Get all the coaches of a team
     Uses most recent urls from teamListcsv to go through coaches list    
@@ -543,20 +892,20 @@ def getCoaches(teamListcsv="AllTeamPages.csv", mode = "u", outCsv = "AllTeamCoac
                                                                 only works for current season links)
               "a" all coaches are fetched, this season most recent url for each team must be determined
                                                                 first
+    :session: ScrapeSession collecting the rows, if None rows are written to outCsv at the end of the call
+    :pool: fetching.FetchPool or fetching.AsyncFetcher, if passed all pages are fetched in parallel first,
+           driver is only used for pages the pool failed to fetch
     """
     
-    collist = ['Retrieve_Date', 'Team', "Vorname", "Nachname", "Geboren", "Nationalität",
-               "von", "bis"]
-    try:
-        outDF = pd.read_csv(outCsv, sep=";", encoding="utf8")
-    except:
-        outDF = pd.DataFrame(columns=collist)
+    own_session = session is None
+    if own_session:
+        session = ScrapeSession({"AllTeamCoaches" : outCsv})
     
     #options = webdriver.firefox.options.Options()
     #options.add_argument('-headless')
     #driver = webdriver.Firefox(firefox_options=options)
     
-    teamList = pd.read_csv(teamListcsv, sep=";")
+    teamList = _teamList(session, teamListcsv)
     teamList.sort_values("Season", ascending=False, inplace=True)
     single_list = teamList.drop_duplicates("Team")
     
@@ -569,121 +918,91 @@ def getCoaches(teamListcsv="AllTeamPages.csv", mode = "u", outCsv = "AllTeamCoac
     if mode == "a":
         url_list  = getCurrentList(single_list["Team_URL"])
     
+    # urls must end in trainer.html, currently ending in vereinsinformationen.html
+    url_list = [teamPageUrl(url, "trainer.html") for url in url_list]
+    pages = pool.fetchAll(url_list) if pool is not None else None
+    
     for url in url_list:
-            # urls must end in vereinstermine.html, currently ending in vereinsinformationen.html
-            url_split = url.split("/")
-            url_split[-1] =  "trainer.html"
-            url = "/".join(url_split)
-            
-            try:
-                driver.get(url)
-            except:
-                driver.get(url)
-            
-            blankHTML = driver.page_source
-            soup = BeautifulSoup(blankHTML, "lxml") 
+            team = url.split("/")[-2]
             
-            # find main container with all coaches in it
-            main_container = soup.find("div", {"id" : "slidercontainer"})
-            
-            try:
-                # get one container per coach
-                coaches = main_container.find_all("div", {"class" : "trainerverlauf_Container"})
-            except:
+            rows = parseCoaches(pageSource(url, driver, pages), team)
+            if rows is None:
                 print("Skipped emtpy ", url)
                 continue
             
-            # get first part with coach general data
-            for c in coaches:
-                coach_cv = c.find_all("tbody")[0]
-                coach_cv_subs = coach_cv.find_all("tr")
-                
-                for entry in coach_cv_subs:
-                    if 'Vorname' in entry.text:
-                        vorname = entry.text[entry.text.find(":") + 1: ]
-                    if 'Nachname' in entry.text:
-                        nachname = entry.text[entry.text.find(":") + 1: ]
-                    if 'Geboren' in entry.text:
-                        geboren = entry.text[entry.text.find(":") + 1: ].strip()
-                    if 'Nation' in entry.text:
-                        nation = entry.text[entry.text.find(":") + 1: ]
-                    if 'von:' in entry.text:
-                        von = entry.text[entry.text.find(":") + 1 : entry.text.rfind(",")]
-                    if 'bis:' in entry.text:
-                        if "," in entry.text:
-                            bis = entry.text[entry.text.find(":") + 1 : entry.text.rfind(",")]
-                        else:
-                            bis = entry.text[entry.text.find(":") + 1 : ]
-                    
-                outDF = outDF.append({'Retrieve_Date' :  pendulum.now().to_date_string(),
-                                      'Team' : url_split[-2], 
-                                      "Vorname" : vorname, 
-                                      "Nachname" : nachname, 
-                                      "Geboren" : geboren, 
-                                      "Nationalität" : nation,
-                                      "von" : von, 
-                                      "bis" : bis}, 
-                                    ignore_index=True)
+            # duplicates are dropped by the session when saving
+            session.add("AllTeamCoaches", rows)
                 
-                outDF.drop_duplicates(subset=['Team', 'Vorname', 'Nachname', 'von'] ,inplace=True)
-                
-            print(len(coaches), " Coaches of ", url_split[-2] ,"done")    
+            print(len(rows), " Coaches of ", team ,"done")    
     
-            outDF.to_csv(outCsv, sep=";")
+    if own_session:
+        session.save()
     
     #driver.close()
 
 
 def getCurrentGameDay(league, in_df):
     """
-    Returns the current GameDay (int) as determined from  :in_df:
-        for :league: 1 or 2
+    Returns the last GameDay (int) of :league: 1 or 2 with a played game in :in_df:, 0 if none is played yet
         
-        :in_df: should only contain data from current season
+        :in_df: AllTeamResults rows, should only contain data from current season
     """ 
     
-    # reduce entries to only contain BL or 2.BL entries
-    if league == 1:
-        in_df = in_df[in_df["Wettbewerb"].isin(["BL"])]
-    elif league == 2:
-        in_df = in_df[in_df["Wettbewerb"].isin(["2.BL"])]
-    
-    # choose first team from current season
-    in_df = in_df[in_df["Team"] == in_df["Team"].unique()[0] ]
-    # remove all scores that are -:-
-    in_df = in_df[in_df["Score"] != "-:-" ]
-
-    # sort by gameday, recent / highest number is on top
-    in_df = in_df.sort_values("Spt./Runde", ascending=False)
-    # get gameday by index locations
-    last_gameday = in_df.iloc[0,6]
+    # reduce entries to played BL or 2.BL games
+    in_df = in_df[(in_df["Wettbewerb"] == {1: "BL", 2: "2.BL"}[league]) & (in_df["Score"] != "-:-")]
     
-    # clean last_gameday, as it is still a string in form 9. Spt. or 10. Spt.
-    return int(last_gameday[ : last_gameday.find(".")])
+    # gameday is a string in form 9. Spt. or 10. Spt.
+    gamedays = pd.to_numeric(in_df["Spt./Runde"].astype(str).str.extract(r"^(\d+)\.", expand=False), errors="coerce")
+    return int(gamedays.max()) if gamedays.notna().any() else 0
 
 
 
 def updateAll(allTeamPages_csv = "AllTeamPages.csv", allTeamResults_csv = "AllTeamResults.csv", 
-              allTables_csv = "AllTables.csv", allCoaches_csv = "AllTeamCoaches.csv", gameDays=None):
+              allTables_csv = "AllTables.csv", allCoaches_csv = "AllTeamCoaches.csv", gameDays=None,
+              workers=4, min_interval=1.0, cache_hours=6, recheck_gamedays=4):
     """
     will update the above specified files for current season & gameday
     
-    will update allTeamResults and allTables even if they are up to date! (Refetch everything for cur season)
+    will update allTeamResults even if it is up to date! (Refetch everything for cur season)
+    allTables is only fetched for gamedays that are missing or whose table is not final yet (see finalGameDays())
     
     Should not be run on actual gamedays but only AFTER, unwanted behaviour expected otherwise
-    """
     
-    options = webdriver.firefox.options.Options()
-    options.add_argument('-headless')
-    driver = webdriver.Firefox(firefox_options=options)    
+    All files are written once at the end of the run, a crashed run is recovered from the journals
+    (see ScrapeSession) on the next call
     
+    Pages are downloaded without a browser (see fetching.AsyncFetcher), a browser is only started 
+    for pages that could not be fetched or parsed that way
+    
+    :workers: number of parallel connections, and of browsers for pages that need one
+    :min_interval: minimum seconds between two requests to kicker.de
+    :cache_hours: pages of the current season are fetched again if they are older than this, pages of 
+                  past seasons are always read from the cache (folder html_cache next to allTables_csv)
+    :gameDays: (league 1, league 2) last gameday to fetch the table of, default is the gameday after the 
+               last played one in allTeamResults
+    :recheck_gamedays: stored tables that are not final are only fetched again if they are at most this many
+                       gamedays before the last played one
+    """
     
     cur_season = getCurrentSeason() 
     
+    cache = fetching.HtmlCache(os.path.join(os.path.dirname(os.path.abspath(allTables_csv)), "html_cache"),
+                               current_season=cur_season, max_age_hours=cache_hours)
+    
+    # fetches the pages of each step concurrently, browsers only load pages that failed
+    pool = fetching.AsyncFetcher(connections=workers, min_interval=min_interval, check=pageParsable,
+                                 fallback=fetching.FetchPool(workers=workers, min_interval=min_interval),
+                                 cache=cache)
+    
+    session = ScrapeSession({"AllTeamPages" : allTeamPages_csv,
+                             "AllTeamResults" : allTeamResults_csv,
+                             "AllTables" : allTables_csv,
+                             "AllTeamCoaches" : allCoaches_csv})
+    
     # will check if AllTeamPages was run for current season. If run, will be skipped
-    aTP_df = pd.read_csv(allTeamPages_csv, sep=";")
-    if cur_season not in aTP_df["Season"].unique():
-        getAllTeamPages(allTeamPages_csv)
+    if not session.contains("AllTeamPages", Season=cur_season):
+        getAllTeamPages(allTeamPages_csv, session=session, pool=pool)
+        session.save()
         print("Teampages updated")
     else:
         print("Teampages not updated, still up-to-date")
@@ -693,7 +1012,7 @@ def updateAll(allTeamPages_csv = "AllTeamPages.csv", allTeamResults_csv = "AllTe
     
         
     # update AllTeamResults next, to use this to extract current gameday
-    teamResultsBuilder(allTeamPages_csv, mode = 'u', outCsv=allTeamResults_csv, driver=driver)
+    teamResultsBuilder(allTeamPages_csv, mode = 'u', outCsv=allTeamResults_csv, session=session, pool=pool)
     print("Teamresults updated")
     
     
@@ -708,39 +1027,44 @@ def updateAll(allTeamPages_csv = "AllTeamPages.csv", allTeamResults_csv = "AllTe
 
     
     
-    # update AllTables, by checking how many gamedays are missing 
-    aT_df = pd.read_csv(allTables_csv, sep=";")
-    data_game_day_BL1 = aT_df[ (aT_df["Season"]==cur_season) & (aT_df["League"]==1)]["GameDay"].max()
-    data_game_day_BL2 = aT_df[ (aT_df["Season"]==cur_season) & (aT_df["League"]==2)]["GameDay"].max()
-    
-    # cut off current season, save file back to csv, then re-run current season
-    aT_df  = aT_df [aT_df ["Season"] != cur_season]
-    aT_df.to_csv(allTables_csv, sep=";")
+    # update AllTables, by checking which gamedays are missing or not final yet
+    aT_df = session.table("AllTables")
+    aT_df = aT_df[aT_df["Season"].astype(int) == cur_season]
+    aTR_df = session.table("AllTeamResults")
+    aTR_df = aTR_df[aTR_df["Season"].astype(int) == cur_season]
     
+    gameday_list = []
     for l in [1,2]:
         
-        # determine maximum gameday to crawl in current season
-        #if l == 1:
-        #    upper_boundary = data_game_day_BL1
-        #else:
-        #    upper_boundary = data_game_day_BL2
-        # 
-        #if upper_boundary not in range(1,35):
-        upper_boundary = gameDays[l-1]
+        # determine maximum gameday to crawl in current season, tables of gamedays not played yet are never 
+        # final, so only the next gameday (may be running already) is fetched beyond the last played one
+        current = getCurrentGameDay(l, aTR_df)
+        upper_boundary = gameDays[l-1] if gameDays is not None else current + 1
         
         # ensure maximum gameday is 34
         upper_boundary = min(upper_boundary, 34)
         
-        for g in range(1, upper_boundary+1):
-            getTableFromKicker(cur_season, l, g, allTables_csv, driver=driver)
+        league_gamedays = gameDaysToFetch(aT_df[aT_df["League"].astype(int) == l], upper_boundary, current, 
+                                          recheck_gamedays)
+        gameday_list += [(l, g) for g in league_gamedays]
+        print("League ", l, ": fetching ", league_gamedays)
+    
+    # stored rows of not final gamedays are replaced (force), all other gamedays stay untouched
+    pages = pool.fetchAll([tableUrl(cur_season, l, g) for l, g in gameday_list])
+    for l, g in gameday_list:
+        getTableFromKicker(cur_season, l, g, allTables_csv, force=True, session=session, pages=pages)
 
     print("TeamTables updated")
 
 
     # # # # #
-    getCoaches(teamListcsv=allTeamPages_csv, mode='u', outCsv = allCoaches_csv, driver=driver)
+    getCoaches(teamListcsv=allTeamPages_csv, mode='u', outCsv = allCoaches_csv, session=session, pool=pool)
+    
+    # write all tables once
+    session.save()
     
-    driver.close()
+    pool.close()
+    print("Page cache: ", cache.stats())
 
 
 
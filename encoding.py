@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+# one-hot encoding of the team columns into a sparse matrix, fitted once on the training data
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+
+RESULT_COLUMNS = ["Result_t1goals", "Result_goaldiff"]
+
+
+class TeamEncoder:
+    """
+    Encodes an ml frame (build_dfs.build_ml_df()) into a sparse feature matrix:
+        numeric columns | one column per known team for Team1 | one column per known team for Team2
+
+    fit() stores the numeric columns and the teams of the training data, transform() encodes any frame
+    with these columns in one step. Teams not seen in fit() get no team column set (all zeros),
+    numeric columns missing in the frame raise a KeyError.
+    Pickled together with the model (see registry.ModelRegistry), so predict frames get the training columns.
+
+    :team_columns: columns holding team names or ids
+    """
+
+    def __init__(self, team_columns=("Team1", "Team2")):
+        self.team_columns = list(team_columns)
+        self.teams = None
+        self.numeric_columns = None
+
+    def fit(self, df):
+        """
+        Learn numeric columns and teams of :df:, result columns are not part of the features
+        """
+        self.numeric_columns = [c for c in df.columns if c not in self.team_columns + RESULT_COLUMNS]
+
+        # one team list for all team columns, ids from ml.csv and names are compared as strings
+        teams = pd.unique(pd.concat([df[col].astype(str) for col in self.team_columns], ignore_index=True))
+        self.teams = pd.Index(np.sort(teams))
+        return self
+
+    def transform(self, df):
+        """
+        Returns sparse (csr) feature matrix of :df:
+        """
+        n_rows = len(df)
+        blocks = [sparse.csr_matrix(df[self.numeric_columns].to_numpy(dtype=np.float64))]
+
+        for col in self.team_columns:
+            # position of the team in self.teams, -1 for unseen teams
+            codes = self.teams.get_indexer(df[col].astype(str))
+            known = codes >= 0
+            blocks.append(sparse.csr_matrix((np.ones(known.sum()), (np.arange(n_rows)[known], codes[known])),
+                                            shape=(n_rows, len(self.teams))))
+
+        return sparse.hstack(blocks, format="csr")
+
+    def fit_transform(self, df):
+        return self.fit(df).transform(df)
+
+    def columns(self):
+        """
+        Names of the matrix columns, team columns are named like pd.get_dummies does (eg Team1_17)
+        """
+        return self.numeric_columns + [col + "_" + team for col in self.team_columns for team in self.teams]
@@ -0,0 +1,310 @@
+# -*- coding: utf-8 -*-
+
+# vectorized feature engine, computes all human_table.csv columns in bulk instead of one fixture at a time
+
+import copy
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+import pendulum
+
+import indexes
+
+
+# column layout of human_table.csv before switch_teams() drops the Home columns
+HUMAN_COLUMNS = ['Retrieve_Date',
+                 'Game_Date',
+
+                 "Team1",
+                 "Team2",
+
+                 "CurLeague", # Current League
+                 "Result", # Game Endresult
+
+                 "Team1_Home", # 1 if Team 1 is Hometeam, else 0
+                 "Team2_Home", # 1 if Team 2 is Hometeam, else 0
+
+                 "GameTimeOfDay", # Time of Game
+                 "GameWeekday", # Weekday of Game
+                 "GameDay", # GameDay in League
+
+                 "GamesSinceLastWin1", # No. of games since last won game Team1
+                 "GamesSinceLastWin2", # No. of games since last won game Team2
+
+                 "TimeSinceLastGame1", # Time in Hours since last game Team 1
+                 "TimeSinceLastGame2", # Time in Hours since last game Team 2
+
+                 "LastGameOverTime1", # Was last game of Team 1 with overtime or penalty shootout
+                 "LastGameOverTime2", # Was last game of Team 2 with overtime or penalty shootout
+
+                 "TimeSinceLastCoach1", # Time since Team 1 has current coach (if any)
+                 "TimeSinceLastCoach2", # Time since Team 2 has current coach (if any)
+
+                 "CurrentPoints1", # current position in league Team 1
+                 "CurrentPoints2", # current position in league Team 2
+
+                 "CurrentPosition1", # current position in league Team 1
+                 "CurrentPosition2", # current position in league Team 2
+
+                 "CurrentGoalDif1", # current goal difference Team 1
+                 "CurrentGoalDif2", # current goal difference Team 2
+
+                 "CurrentWin1", # current wins in season of Team 1
+                 "CurrentDraws1", # current draws in season of Team 1
+                 "CurrentLoss1", # current losses in season of Team 1
+                 "CurrentWin2", # current wins in season of Team 2
+                 "CurrentDraws2", # current draws in season of Team 2
+                 "CurrentLoss2", # current losses in season of Team 2
+
+                 "LastSeasonPosition1", # last season's final position in league Team 1
+                 "LastSeasonPosition2", # last season's final position in league Team 2
+
+                 "LastSeasonLeague1", # last season league of Team 1
+                 "LastSeasonLeague2", # last season league of Team 2
+
+                 "Past5YearsInThisLeague1", # 1 if Team1 played in same league for past 5 years, else 0
+                 "Past5YearsInThisLeague2", # 1 if Team2 played in same league for past 5 years, else 0
+
+                 "LastDirectGame1", # Last direct meeting of both teams results (0:0 if none)
+                 "LastDirectGame2", # 2nd last direct meeting of both teams results (0:0 if none)
+                 "LastDirectGame3", # 3rd last direct meeting of both teams results (0:0 if none)
+
+                 "LastDirectGame1_time", # Time in days since last direct meeting of both teams results (99999 if none)
+                 "LastDirectGame2_time", # Time in days since 2nd last direct meeting of both teams results (99999 if none)
+                 "LastDirectGame3_time", # Time in days since 3rd last direct meeting of both teams results (99999 if none)
+
+                 "LastGameTeam1_1", # Last 5 game results of Team 1
+                 "LastGameTeam1_2",
+                 "LastGameTeam1_3",
+                 "LastGameTeam1_4",
+                 "LastGameTeam1_5",
+                 "LastGameTeam2_1", # Last 5 game results of Team 2
+                 "LastGameTeam2_2",
+                 "LastGameTeam2_3",
+                 "LastGameTeam2_4",
+                 "LastGameTeam2_5",
+
+                 "CL_candidate1", # Team 1 playing Champions League this season
+                 "CL_candidate2", # Team 2 playing Champions League this season
+
+                 "EL_candidate1", # Team 1 playing Europe League this season
+                 "EL_candidate2", # Team 2 playing Europe League this season
+                 ]
+
+# # # # # # # # # HELPER FUNCTIONS # # # # # # # # #
+
+def seasonFromDates(dates):
+    """
+    Vectorized build_dfs.seasonFromDate for a datetime Series. August splits season
+    """
+    return np.where(dates.dt.month < 8, dates.dt.year - 2001, dates.dt.year - 2000)
+
+
+def prepareResults(allTeamResults):
+    """
+    Adds the derived columns T1Goals, T2Goals, IsWin and Date to a copy of allTeamResults
+
+    IsWin is 1 for a win, 0 for a draw, -1 for a loss and NaN for games without result
+    """
+    results = allTeamResults.copy()
+
+    # tables loaded with the storage.py types come with parsed goals and Date already
+    if "T1Goals" in results.columns and "Date" in results.columns:
+        results["T1Goals"] = results["T1Goals"].astype(float)
+        results["T2Goals"] = results["T2Goals"].astype(float)
+    else:
+        # split x:x into numeric T1Goals and T2Goals, "-:-" turns into NaN
+        goals = results["Score"].str.split(":", n=1, expand=True)
+        results["T1Goals"] = pd.to_numeric(goals[0], errors="coerce")
+        results["T2Goals"] = pd.to_numeric(goals[1], errors="coerce")
+
+        # convert Termin column to new DateTime type column Date
+        results["Date"] = pd.to_datetime(results["Termin"].str.slice(4), errors='coerce', format='%d.%m.%y %H:%M')
+
+    results["IsWin"] = np.sign(results["T1Goals"] - results["T2Goals"])
+
+    return results
+
+
+class FeaturePipeline:
+    """
+    Preprocesses the raw tables once (Score split, IsWin and Date of allTeamResults, see prepareResults())
+    and builds the lookup indexes of indexes.py from them. features_for() computes the human_table.csv
+    columns of any fixtures with lookups only, so the training frame (buildHumanFrame()) and the predict
+    frames (build_dfs.buildPredictDF()) share one implementation and one preprocessing pass.
+
+    :allX: input DataFrames from data_gathering.py (allCoaches von/bis may be already converted)
+    :alias_index: aliases.AliasIndex of alias.json
+    """
+
+    def __init__(self, allTeamResults, allTables, allCoaches, alias_index):
+        self.alias_index = alias_index
+        self.results = prepareResults(allTeamResults)
+
+        self.timeline = indexes.TeamTimeline(self.results)
+        self.headToHead = indexes.HeadToHead(self.results, alias_index)
+        self.tables = indexes.TableStore(allTables, alias_index)
+        self.coaches = indexes.CoachIndex(allCoaches)
+        self.competitions = indexes.CompetitionSet(self.results)
+
+    def features_for(self, fixtures, as_of=None):
+        """
+        Returns DataFrame with HUMAN_COLUMNS for :fixtures:, one row per fixture in the same order,
+        still containing Team1_Home/Team2_Home (pass to switch_teams()).
+        Table columns are NaN where the table of the previous gameday is missing.
+
+        :fixtures: league games as rows of allTeamResults (played or upcoming), Team is Team1 and Gegner Team2
+        :as_of: only games and coaches known before this datetime are used, default is the kickoff of each
+                fixture. Tables are always the ones of the previous gameday
+        """
+        fixtures = fixtures.reset_index(drop=True)
+        dates = pd.to_datetime(fixtures["Termin"].str.slice(4), errors='coerce', format='%d.%m.%y %H:%M')
+        known = dates if as_of is None else dates.clip(upper=pd.Timestamp(as_of))
+        seasons = seasonFromDates(dates)
+
+        out = pd.DataFrame(index=fixtures.index)
+        out["Retrieve_Date"] = pendulum.now().to_date_string()
+        out["Game_Date"] = dates.dt.strftime("%Y-%m-%d")
+        out["Team1"] = self.alias_index.translate(fixtures["Team"])
+        out["Team2"] = self.alias_index.translate(fixtures["Gegner"])
+        out["CurLeague"] = np.where(fixtures["Wettbewerb"] == 'BL', 1, 2)
+        out["Result"] = fixtures["Score"] if "Score" in fixtures else "-:-"
+        out["Team1_Home"] = (fixtures["Wo"] == "H").astype(int)
+        out["Team2_Home"] = 1 - out["Team1_Home"]
+        out["GameTimeOfDay"] = dates.dt.hour * 60 + dates.dt.minute
+        # same numbering as pendulum day_of_week, sunday is 0
+        out["GameWeekday"] = (dates.dt.dayofweek + 1) % 7
+        out["GameDay"] = fixtures["Spt./Runde"].str.extract(r"^(\d+)\.", expand=False).astype(int)
+
+        # Team of allTeamResults is already the kicker name of Team1
+        kicker = {"1": fixtures["Team"].astype(object).values,
+                  "2": self.alias_index.kickerNames(fixtures["Gegner"]).values}
+
+        for t in ["1", "2"]:
+            state = self.timeline.stateBefore(kicker[t], dates, as_of=known)
+            out["GamesSinceLastWin" + t] = state["GamesSinceLastWin"]
+            out["TimeSinceLastGame" + t] = state["TimeSinceLastGame"]
+            out["LastGameOverTime" + t] = state["LastGameOverTime"]
+            for g in range(1, 6):
+                out["LastGameTeam{}_{}".format(t, g)] = state["LastGame_{}".format(g)]
+
+            out["TimeSinceLastCoach" + t] = self.coaches.daysSince(kicker[t], dates, as_of=known)
+
+            standings = self.tables.standingsBefore(out["Team" + t].values, seasons, out["GameDay"].values,
+                                                    out["CurLeague"].values)
+            for col in standings.columns:
+                out[col + t] = standings[col]
+
+            for col, values in self.competitions.candidates(kicker[t], seasons).items():
+                out[col + t] = values
+
+        direct = self.headToHead.lastMeetings(out["Team1"].values, out["Team2"].values, dates, k=3, as_of=known)
+        for col in direct.columns:
+            out[col] = direct[col]
+
+        return out[HUMAN_COLUMNS]
+
+
+def featuresSharded(pipeline, fixtures, n_jobs=-1):
+    """
+    FeaturePipeline.features_for() of :fixtures: computed in a process pool, one task per season and league.
+    Every fixture only depends on data before it, so shards are independent. Output has the same order as
+    :fixtures:, regardless of the order the shards finish in.
+
+    Workers get the pipeline without its results frame: the indexes consist of numeric NumPy arrays,
+    which joblib hands to the workers as read-only memory maps instead of pickling them for every task
+    """
+    fixtures = fixtures.reset_index(drop=True)
+    dates = pd.to_datetime(fixtures["Termin"].str.slice(4), errors='coerce', format='%d.%m.%y %H:%M')
+    shards = fixtures.groupby([seasonFromDates(dates), fixtures["Wettbewerb"].values]).indices
+
+    shared = copy.copy(pipeline)
+    shared.results = None
+
+    # shards in fixed (season, league) order, so the merged frame does not depend on scheduling
+    keys = sorted(shards)
+    parts = Parallel(n_jobs=n_jobs, max_nbytes="1M", mmap_mode="r")(
+        delayed(shared.features_for)(fixtures.iloc[shards[key]]) for key in keys)
+
+    out = pd.concat(parts, ignore_index=True)
+    positions = np.concatenate([shards[key] for key in keys])
+    return out.iloc[np.argsort(positions, kind="mergesort")].reset_index(drop=True)
+
+
+# # # # # # # # # BUILD INPUT DF # # # # # # # # #
+
+def gameKeys(pairs):
+    """
+    Returns uint64 hash for each game key string (team pair + Termin), stable between runs
+    """
+    return pd.util.hash_array(np.asarray(pairs, dtype=object))
+
+
+def buildHumanFrame(allTeamResults, allTables, allCoaches, alias_index, min_season=5, skip_keys=None,
+                    pipeline=None, n_jobs=1):
+    """
+    Computes all human_table.csv columns for all played league games in one pass
+    Returns DataFrame with HUMAN_COLUMNS, still containing Team1_Home/Team2_Home (pass to switch_teams()).
+    Index of the returned DataFrame is the gameKeys() hash of each game
+
+    :allX: input DataFrames from data_gathering.py (allCoaches von/bis may be already converted)
+    :alias_index: aliases.AliasIndex of alias.json
+    :min_season: skip games before this season, as one season before is needed for data gathering
+    :skip_keys: array of gameKeys() hashes of games already built, these are not computed again
+    :pipeline: FeaturePipeline of the allX tables, built if not passed
+    :n_jobs: number of processes, games are split by season and league (see featuresSharded()), 
+             -1 uses all cores, 1 computes all games in this process
+    """
+    if pipeline is None:
+        pipeline = FeaturePipeline(allTeamResults, allTables, allCoaches, alias_index)
+
+    results = pipeline.results.copy()
+    # original row order, used to decide which team's row is used for a game and to order the output
+    results["order"] = np.arange(len(results))
+
+    # # # select league games, each game only once # # #
+
+    played = results[(results["Score"] != "-:-") & results["Date"].notna()]
+    played = played.drop_duplicates(["Team", "Termin"], keep="last")
+
+    games = played[played["Wettbewerb"].isin(['BL', '2.BL'])].copy()
+    games = games[seasonFromDates(games["Date"]) >= min_season]
+
+    team1 = alias_index.translate(games["Team"])
+    team2 = alias_index.translate(games["Gegner"])
+
+    # both teams have the game in their list, keep the first one found in allTeamResults
+    termin = games["Termin"].astype(object)
+    games["pair"] = np.where(team1 < team2, team1 + "|" + team2, team2 + "|" + team1) + "|" + termin
+    games = games.sort_values("order").drop_duplicates("pair")
+    games["key"] = gameKeys(games["pair"])
+
+    if skip_keys is not None:
+        games = games[~np.isin(games["key"].values, skip_keys)]
+
+    # games missing in the results of team2 are skipped
+    team2_game = pd.MultiIndex.from_arrays([alias_index.kickerNames(games["Gegner"]).values,
+                                            games["Termin"].astype(object).values])
+    games = games[team2_game.isin(pd.MultiIndex.from_arrays([played["Team"].astype(object).values,
+                                                             played["Termin"].astype(object).values]))]
+
+    if n_jobs == 1:
+        out = pipeline.features_for(games)
+    else:
+        out = featuresSharded(pipeline, games, n_jobs)
+    out.index = games["key"].values
+    out.index.name = "GameKey"
+
+    # games without table entry of the previous gameday are skipped
+    out = out[out["CurrentPoints1"].notna() & out["CurrentPoints2"].notna()]
+
+    # all columns except dates, team names and results are integers
+    str_cols = ['Retrieve_Date', 'Game_Date', "Team1", "Team2", "Result",
+                "LastDirectGame1", "LastDirectGame2", "LastDirectGame3"] + \
+               ["LastGameTeam{}_{}".format(t, g) for t in ["1", "2"] for g in range(1, 6)]
+    int_cols = [c for c in HUMAN_COLUMNS if c not in str_cols]
+    out[int_cols] = out[int_cols].astype(int)
+
+    return out
@@ -0,0 +1,429 @@
+# -*- coding: utf-8 -*-
+
+"""
+Parallel download of the kicker pages used by data_gathering.py
+
+FetchPool runs a number of workers, each with its own headless Firefox (browser=True) or its own
+requests.Session (browser=False, enough for pages that do not need JavaScript). 
+AsyncFetcher downloads the pages with asyncio over a pool of keep-alive connections and hands pages 
+it could not fetch or parse to a fallback (eg a browser FetchPool).
+Requests to the same host are spaced by :min_interval: seconds, failed requests are retried with growing waits.
+With an HtmlCache passed, fresh pages are read from disk and expired ones are revalidated with a conditional request.
+
+Fetchers only return the html of the pages, parsing stays in data_gathering.py:
+
+    with FetchPool(workers=4) as pool:
+        pages = pool.fetchAll(urls)     # dict url -> html, None if the page could not be fetched
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlparse
+
+import aiohttp
+import requests
+from selenium import webdriver
+
+
+def _cachedPages(cache, urls):
+    """
+    dict url -> html of all :urls: fresh in :cache:
+    """
+    if cache is None:
+        return {}
+    pages = {url: cache.get(url) for url in urls}
+    return {url: html for url, html in pages.items() if html is not None}
+
+
+def _runCoroutine(coroutine):
+    """
+    Runs :coroutine: to completion and returns its result, also if an event loop is already running in this
+    thread (eg cells in Jupyter or Spyder), where asyncio.run() raises RuntimeError. Then it runs in a new
+    event loop of a worker thread
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coroutine).result()
+
+
+class RateLimiter:
+    """
+    Allows one request per :min_interval: seconds and host, shared by all workers
+    """
+
+    def __init__(self, min_interval=1.0):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._next = {}
+
+    def delay(self, url):
+        """
+        Reserves the next free slot for the host of :url:, returns seconds to wait until then
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next.get(host, now))
+            # reserve the slot before sleeping, so waiting workers queue up behind each other
+            self._next[host] = start + self.min_interval
+        return max(0, start - now)
+
+    def wait(self, url):
+        """
+        Blocks until the next request to the host of :url: is allowed
+        """
+        time.sleep(self.delay(url))
+
+
+class HtmlCache:
+    """
+    On-disk cache of fetched pages
+
+    Pages are stored content-addressed (file name is the sha1 of the html, identical pages are stored once),
+    index.json maps each url to its page, fetch time and the ETag / Last-Modified headers for revalidation.
+
+    Freshness by url: pages of seasons before :current_season: never expire if they were fetched after their
+    season ended (finished seasons do not change), all other pages expire :max_age_hours: after they were fetched
+
+    :folder: cache folder, created if missing
+    :current_season: int, eg 18 for 2018/19; if None every page expires after :max_age_hours:
+    """
+
+    # kicker urls contain the season as /2018-19/
+    SEASON = re.compile(r"/20(\d\d)-\d\d/")
+
+    def __init__(self, folder, current_season=None, max_age_hours=6):
+        self.folder = folder
+        self.current_season = current_season
+        self.max_age_hours = max_age_hours
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(folder, exist_ok=True)
+        try:
+            with open(self._indexFile(), "r", encoding="utf8") as j:
+                self.index = json.load(j)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def _indexFile(self):
+        return os.path.join(self.folder, "index.json")
+
+    def _pageFile(self, digest):
+        return os.path.join(self.folder, digest[:2], digest + ".html")
+
+    def _read(self, entry):
+        try:
+            with open(self._pageFile(entry["sha1"]), "r", encoding="utf8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def maxAge(self, url, fetched=None):
+        """
+        Seconds a page of :url: fetched at :fetched: (epoch seconds) stays fresh, None if it never expires
+        """
+        match = self.SEASON.search(url)
+        if match is not None and self.current_season is not None and int(match.group(1)) < self.current_season:
+            # a page fetched while its season was running misses the later games, August splits seasons
+            season_end = datetime(2000 + int(match.group(1)) + 1, 8, 1).timestamp()
+            if fetched is not None and fetched >= season_end:
+                return None
+        return self.max_age_hours * 3600
+
+    def get(self, url):
+        """
+        Returns cached html of :url: if it is fresh, None otherwise. Counts hits and misses
+        """
+        entry = self.index.get(url)
+        html = None
+        if entry is not None:
+            max_age = self.maxAge(url, entry["fetched"])
+            if max_age is None or time.time() - entry["fetched"] < max_age:
+                html = self._read(entry)
+
+        with self._lock:
+            if html is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return html
+
+    def headers(self, url):
+        """
+        Request headers to revalidate the cached (expired) page of :url:, empty if there is none
+        """
+        entry = self.index.get(url)
+        if entry is None:
+            return {}
+        headers = {}
+        if entry.get("etag") is not None:
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified") is not None:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def notModified(self, url):
+        """
+        Server answered 304 for :url:, returns the cached html and marks it fresh again
+        """
+        with self._lock:
+            self.revalidated += 1
+            self.index[url]["fetched"] = time.time()
+        return self._read(self.index[url])
+
+    def put(self, url, html, etag=None, last_modified=None):
+        """
+        Stores :html: as page of :url:
+        """
+        digest = hashlib.sha1(html.encode("utf8")).hexdigest()
+        path = self._pageFile(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf8") as f:
+                f.write(html)
+            os.replace(path + ".tmp", path)
+
+        with self._lock:
+            self.index[url] = {"sha1": digest, "fetched": time.time(), "etag": etag, "last_modified": last_modified}
+
+    def save(self):
+        """
+        Writes the index, pages are written by put() right away
+        """
+        with self._lock:
+            with open(self._indexFile() + ".tmp", "w", encoding="utf8") as j:
+                json.dump(self.index, j)
+            os.replace(self._indexFile() + ".tmp", self._indexFile())
+
+    def stats(self):
+        """
+        dict of hits (fresh pages read from disk), misses (pages not fresh in the cache) and
+        revalidated (misses the server answered with 304, read from disk as well)
+        """
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses}
+
+
+class FetchPool:
+    """
+    Pool of :workers: browsers or http sessions fetching pages in parallel
+
+    :browser: True uses headless Firefox instances (page_source after rendering), False plain http requests
+    :min_interval: minimum seconds between two requests to the same host
+    :retries: additional tries after a failed request, waits 2, 4, 8 ... seconds in between
+    :timeout: page load timeout in seconds
+    :cache: HtmlCache, fresh pages are taken from it and fetched pages stored in it
+    """
+
+    def __init__(self, workers=4, browser=True, min_interval=1.0, retries=2, timeout=60, cache=None):
+        self.workers = workers
+        self.browser = browser
+        self.retries = retries
+        self.timeout = timeout
+        self.cache = cache
+        self.limiter = RateLimiter(min_interval)
+        self._local = threading.local()
+        self._clients = []
+        self._clients_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=workers)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _client(self):
+        """
+        Browser or session of the current worker thread, started on first use
+        """
+        client = getattr(self._local, "client", None)
+        if client is None:
+            if self.browser:
+                options = webdriver.firefox.options.Options()
+                options.add_argument('-headless')
+                client = webdriver.Firefox(firefox_options=options)
+                client.set_page_load_timeout(self.timeout)
+            else:
+                client = requests.Session()
+            self._local.client = client
+            with self._clients_lock:
+                self._clients.append(client)
+        return client
+
+    def _get(self, url):
+        client = self._client()
+        if self.browser:
+            client.get(url)
+            if self.cache is not None:
+                self.cache.put(url, client.page_source)
+            return client.page_source
+
+        headers = self.cache.headers(url) if self.cache is not None else {}
+        r = client.get(url, timeout=self.timeout, headers=headers)
+        if r.status_code == 304:
+            return self.cache.notModified(url)
+        r.raise_for_status()
+        # requests assumes latin-1 if the server sends no charset, kicker pages are utf-8
+        if "charset" not in r.headers.get("content-type", ""):
+            r.encoding = r.apparent_encoding
+        if self.cache is not None:
+            self.cache.put(url, r.text, r.headers.get("ETag"), r.headers.get("Last-Modified"))
+        return r.text
+
+    def fetch(self, url):
+        """
+        Returns html of :url:, None if all tries failed
+        """
+        for attempt in range(self.retries + 1):
+            self.limiter.wait(url)
+            try:
+                return self._get(url)
+            except Exception as e:
+                if attempt == self.retries:
+                    print("Fetching ", url, " failed: ", e)
+                    return None
+                time.sleep(2 ** (attempt + 1))
+
+    def fetchAll(self, urls):
+        """
+        Fetches all :urls: in parallel, returns dict url -> html (None for failed pages)
+        """
+        urls = list(dict.fromkeys(urls))
+        pages = _cachedPages(self.cache, urls)
+
+        missing = [url for url in urls if url not in pages]
+        pages.update(zip(missing, self._executor.map(self.fetch, missing)))
+
+        if self.cache is not None:
+            self.cache.save()
+        return {url: pages[url] for url in urls}
+
+    def close(self):
+        """
+        Stops all workers and closes their browsers / sessions
+        """
+        self._executor.shutdown(wait=True)
+        for client in self._clients:
+            try:
+                if self.browser:
+                    client.quit()
+                else:
+                    client.close()
+            except Exception:
+                pass
+        self._clients = []
+
+
+class AsyncFetcher:
+    """
+    Downloads pages with asyncio and aiohttp, all requests share one pool of keep-alive connections
+
+    :connections: maximum number of open connections per host
+    :min_interval: minimum seconds between two requests to the same host
+    :retries: additional tries after a failed request, waits 2, 4, 8 ... seconds in between
+    :timeout: total timeout per request in seconds
+    :check: function(url, html) -> bool, False if the page can not be parsed (eg content rendered by JavaScript)
+    :fallback: fetcher with a fetchAll() method (eg FetchPool(browser=True)) for pages that failed
+               or did not pass :check:, None to return them as None
+    :cache: HtmlCache, fresh pages are taken from it, expired ones are revalidated and only pages
+            that passed :check: are stored in it
+    """
+
+    def __init__(self, connections=8, min_interval=1.0, retries=2, timeout=60, check=None, fallback=None,
+                 cache=None):
+        self.connections = connections
+        self.retries = retries
+        self.timeout = timeout
+        self.check = check
+        self.fallback = fallback
+        self.cache = cache
+        self.limiter = RateLimiter(min_interval)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def _fetch(self, session, url):
+        """
+        Returns (html, ETag, Last-Modified, status) of :url:, html is None if all tries failed
+        """
+        headers = self.cache.headers(url) if self.cache is not None else {}
+        for attempt in range(self.retries + 1):
+            await asyncio.sleep(self.limiter.delay(url))
+            try:
+                async with session.get(url, headers=headers) as r:
+                    if r.status == 304:
+                        return self.cache.notModified(url), None, None, 304
+                    r.raise_for_status()
+                    return await r.text(), r.headers.get("ETag"), r.headers.get("Last-Modified"), r.status
+            except Exception as e:
+                if attempt == self.retries:
+                    print("Fetching ", url, " failed: ", e)
+                    return None, None, None, None
+                await asyncio.sleep(2 ** (attempt + 1))
+
+    async def _fetchAll(self, urls):
+        connector = aiohttp.TCPConnector(limit_per_host=self.connections)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            return await asyncio.gather(*[self._fetch(session, url) for url in urls])
+
+    def fetchAll(self, urls):
+        """
+        Fetches all :urls: concurrently, returns dict url -> html (None for failed pages)
+        Pages that failed or did not pass :check: are fetched again by :fallback:
+        """
+        urls = list(dict.fromkeys(urls))
+        pages = _cachedPages(self.cache, urls)
+
+        # url -> (ETag, Last-Modified) of pages downloaded now, revalidated pages are already in the cache
+        downloaded = {}
+        missing = [url for url in urls if url not in pages]
+        if len(missing) > 0:
+            for url, (html, etag, last_modified, status) in zip(missing, _runCoroutine(self._fetchAll(missing))):
+                pages[url] = html
+                if status == 200:
+                    downloaded[url] = (etag, last_modified)
+
+        failed = [url for url in missing 
+                  if pages[url] is None or (self.check is not None and not self.check(url, pages[url]))]
+        for url in failed:
+            downloaded.pop(url, None)
+
+        if len(failed) > 0 and self.fallback is not None:
+            print(len(failed), " pages fetched again by fallback")
+            pages.update(self.fallback.fetchAll(failed))
+
+            for url in failed:
+                if pages[url] is not None and (self.check is None or self.check(url, pages[url])):
+                    downloaded[url] = (None, None)
+
+        if self.cache is not None:
+            for url, (etag, last_modified) in downloaded.items():
+                self.cache.put(url, pages[url], etag, last_modified)
+            self.cache.save()
+
+        return {url: pages[url] for url in urls}
+
+    def close(self):
+        """
+        Closes the fallback, connections are closed after each fetchAll()
+        """
+        if self.fallback is not None:
+            self.fallback.close()
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+
+# lookup indexes over the raw tables, built once per load and queried for whole batches of fixtures
+
+import numpy as np
+import pandas as pd
+
+
+def _seconds(dates):
+    """
+    Seconds since epoch (int64) of naive datetimes, compared as wall clock times
+    """
+    return pd.to_datetime(pd.Series(dates)).values.astype("datetime64[s]").astype(np.int64)
+
+
+def _utc(dates):
+    """
+    datetime64 in UTC of naive Europe/Berlin datetimes, NaT for times that don't exist or are ambiguous
+    """
+    local = pd.to_datetime(pd.Series(dates)).dt.tz_localize("Europe/Berlin", ambiguous="NaT", nonexistent="NaT")
+    return local.dt.tz_convert("UTC").dt.tz_localize(None).values
+
+
+class _BlockIndex:
+    """
+    Rows sorted by a label (team, team pair) and date, every label owns one contiguous block.
+    "Last row of a label strictly before time t" is one binary search over (label, date) keys
+    """
+
+    def _indexBlocks(self, labels, dates):
+        """
+        :labels: :dates: of all rows, sorted by label and date
+        """
+        self.labels = pd.Index(pd.unique(labels))
+        codes = self.labels.get_indexer(labels).astype(np.int64)
+        # first position of each label's block
+        self.start = np.searchsorted(codes, np.arange(len(self.labels)))
+
+        # key = label * span + seconds since the earliest row, sorted like the rows. Offsets start at 1 and end
+        # before span - 1, so clipped query times (see _keys()) sort before or after all rows of their label
+        seconds = _seconds(dates)
+        self.low = seconds.min() - 1 if len(seconds) > 0 else 0
+        self.span = seconds.max() - self.low + 2 if len(seconds) > 0 else 1
+        self.keys = codes * self.span + (seconds - self.low)
+
+    def _keys(self, codes, dates):
+        """
+        Keys of query :dates: (any range, also before 1970 or NaT) in the labels of :codes:
+        """
+        offset = np.clip(_seconds(dates), self.low, self.low + self.span - 1) - self.low
+        return codes * self.span + offset
+
+    def before(self, labels, dates):
+        """
+        Position of the last row of each label strictly before its date and the number of rows
+        of the label before. Position is meaningless where the count is 0 (also for unknown labels)
+
+        :labels: :dates: equally long arrays
+        """
+        codes = self.labels.get_indexer(np.asarray(labels, dtype=object)).astype(np.int64)
+        known = codes >= 0
+        codes = np.where(known, codes, 0)
+
+        pos = np.searchsorted(self.keys, self._keys(codes, dates), side="left") - 1
+        count = np.where(known, np.clip(pos - self.start[codes] + 1, 0, None), 0)
+        return np.clip(pos, 0, None), count
+
+
+class TeamTimeline(_BlockIndex):
+    """
+    All games with result of every team as flat NumPy arrays (dates, scores, IsWin, Overtime), sorted by
+    team and date. Each team owns one contiguous block, so "state of team X strictly before time t" is one
+    binary search over (team, date) keys, for any number of fixtures at once.
+
+    Teams are the kicker url names of the Team column of allTeamResults.
+
+    :results: features.prepareResults() output
+    """
+
+    def __init__(self, results):
+        played = results[(results["Score"] != "-:-") & results["Date"].notna()]
+        played = played.drop_duplicates(["Team", "Termin"], keep="last")
+        played = played.sort_values(["Team", "Date"], kind="mergesort")
+
+        self._indexBlocks(played["Team"].astype(object).values, played["Date"])
+
+        self.dates = played["Date"].values
+        self.utc = _utc(played["Date"])
+        # scores as codes into a small label array, so all large arrays are numeric (and can be memory mapped)
+        self.score_codes, self.score_labels = pd.factorize(played["Score"].astype(object))
+        self.is_win = played["IsWin"].values.astype(np.int8)
+        self.overtime = played["Overtime"].fillna(0).values.astype(np.int8)
+
+        # position of the last win at or before each row, blocks of other teams lie before a team's start
+        self.last_win = np.maximum.accumulate(np.where(self.is_win == 1, np.arange(len(played)), -1))
+
+    def stateBefore(self, teams, dates, n=5, as_of=None):
+        """
+        State of each team before its date:
+            GamesSinceLastWin: games since the last win (all games played if no win yet)
+            TimeSinceLastGame: hours since the last game in local time (99999 if none)
+            LastGameOverTime:  1 if the last game went to overtime or penalty shootout
+            LastGame_1..n:     last n results, most recent first (0:0 if the team has less games)
+
+        :teams: :dates: equally long arrays of kicker team names and naive datetimes
+        :as_of: array of datetimes, only games before these are used (default :dates:)
+        """
+        pos, count = self.before(teams, dates if as_of is None else as_of)
+        has = count > 0
+        start = pos - count + 1
+
+        state = pd.DataFrame(index=np.arange(len(pos)))
+
+        last_win = self.last_win[pos]
+        state["GamesSinceLastWin"] = np.where(has & (last_win >= start), pos - last_win, count)
+
+        hours = (_utc(dates) - self.utc[pos]) / np.timedelta64(1, "h")
+        state["TimeSinceLastGame"] = np.where(has & ~np.isnan(hours), np.floor(np.nan_to_num(hours)), 99999).astype(int)
+
+        state["LastGameOverTime"] = np.where(has, self.overtime[pos], 0).astype(int)
+
+        for g in range(1, n+1):
+            scores = self.score_labels.values[self.score_codes[np.clip(pos - g + 1, 0, None)]]
+            state["LastGame_{}".format(g)] = np.where(count >= g, scores, "0:0")
+
+        return state
+
+
+class HeadToHead(_BlockIndex):
+    """
+    All meetings with result of every pair of teams, sorted by date. Pairs are unordered (alias.json keys,
+    smaller key first) and goals are stored from the view of the first team of the pair, so one block
+    serves both directions. Games found in both teams' results are only stored once.
+
+    :results: features.prepareResults() output
+    :alias_index: aliases.AliasIndex used to translate Team and Gegner to alias.json keys
+    """
+
+    def __init__(self, results, alias_index):
+        played = results[(results["Score"] != "-:-") & results["Date"].notna()]
+
+        team = alias_index.translate(played["Team"]).values
+        gegner = alias_index.translate(played["Gegner"]).values
+        flip = team > gegner
+
+        meetings = pd.DataFrame({"a": np.where(flip, gegner, team), "b": np.where(flip, team, gegner),
+                                 "Termin": played["Termin"].values, "Date": played["Date"].values,
+                                 "goals_a": np.where(flip, played["T2Goals"], played["T1Goals"]),
+                                 "goals_b": np.where(flip, played["T1Goals"], played["T2Goals"])})
+        meetings = meetings.drop_duplicates(["a", "b", "Termin"], keep="last")
+        meetings = meetings.sort_values(["a", "b", "Date"], kind="mergesort")
+
+        self._indexBlocks((meetings["a"] + "|" + meetings["b"]).values, meetings["Date"])
+
+        self.dates = meetings["Date"].values
+        self.goals_a = meetings["goals_a"].values.astype(np.int16)
+        self.goals_b = meetings["goals_b"].values.astype(np.int16)
+
+    def lastMeetings(self, teams1, teams2, dates, k=3, as_of=None):
+        """
+        Last :k: meetings of both teams strictly before each date:
+            LastDirectGame1..k:      results from the view of teams1, most recent first (0:0 if none)
+            LastDirectGame1..k_time: age of the meeting in days (99999 if none)
+
+        :teams1: :teams2: :dates: equally long arrays of alias.json keys and naive datetimes
+        :as_of: array of datetimes, only meetings before these are used (default :dates:)
+        """
+        teams1 = np.asarray(teams1, dtype=object)
+        teams2 = np.asarray(teams2, dtype=object)
+        dates = pd.to_datetime(pd.Series(dates)).values
+        flip = teams1 > teams2
+
+        pos, count = self.before(np.where(flip, teams2, teams1) + "|" + np.where(flip, teams1, teams2),
+                                 dates if as_of is None else as_of)
+
+        out = pd.DataFrame(index=np.arange(len(pos)))
+        for g in range(1, k+1):
+            idx = np.clip(pos - g + 1, 0, None)
+            met = count >= g
+
+            # goals from the view of the first team of the pair, swapped where teams1 is the second one
+            own = np.where(flip, self.goals_b[idx], self.goals_a[idx]).astype(str).astype(object)
+            other = np.where(flip, self.goals_a[idx], self.goals_b[idx]).astype(str).astype(object)
+            out["LastDirectGame{}".format(g)] = np.where(met, own + ":" + other, "0:0")
+
+            days = (dates - self.dates[idx]) // np.timedelta64(1, "D")
+            out["LastDirectGame{}_time".format(g)] = np.where(met, days, 99999).astype(int)
+
+        return out
+
+
+class TableStore:
+    """
+    League tables as dense arrays indexed by (team, season, gameday), one array per table column.
+    Any number of table entries are looked up in O(1) each by array indexing, no scans of allTables.
+    Teams are alias.json keys, entries of a team found more than once on a gameday keep the first one.
+
+    :allTables: AllTables.csv frame
+    :alias_index: aliases.AliasIndex used to translate Team to alias.json keys
+    :final_gameday: gameday of the final table of a season
+    """
+
+    COLUMNS = ["League", "rank", "points", "diff", "g", "u", "v"]
+
+    def __init__(self, allTables, alias_index, final_gameday=34):
+        tables = allTables[["Team", "Season", "GameDay"] + self.COLUMNS].copy()
+        tables["Team"] = alias_index.translate(tables["Team"])
+        tables = tables.drop_duplicates(["Team", "Season", "GameDay"], keep="first")
+
+        self.final_gameday = final_gameday
+        self.teams = pd.Index(pd.unique(tables["Team"]))
+        self.first_season = int(tables["Season"].min())
+        shape = (len(self.teams), int(tables["Season"].max()) - self.first_season + 1,
+                 max(int(tables["GameDay"].max()), final_gameday) + 1)
+
+        at = (self.teams.get_indexer(tables["Team"]), tables["Season"].values.astype(int) - self.first_season,
+              tables["GameDay"].values.astype(int))
+        # float arrays, NaN where a team has no entry
+        self.values = {}
+        for col in self.COLUMNS:
+            self.values[col] = np.full(shape, np.nan)
+            self.values[col][at] = tables[col].values
+
+    def lookup(self, teams, seasons, gamedays, col, default=np.nan):
+        """
+        :col: of the table entries of :teams: in :seasons: after :gamedays:, :default: where there is none
+        All inputs are broadcast against each other (eg seasons of shape (n, 1) - np.arange(5) for 5 seasons)
+        """
+        codes = self.teams.get_indexer(np.asarray(teams, dtype=object).ravel()).reshape(np.shape(teams))
+        seasons = np.asarray(seasons, dtype=int) - self.first_season
+        gamedays = np.asarray(gamedays, dtype=int)
+        codes, seasons, gamedays = np.broadcast_arrays(codes, seasons, gamedays)
+
+        values = self.values[col]
+        valid = (codes >= 0) & (seasons >= 0) & (seasons < values.shape[1]) & \
+                (gamedays >= 0) & (gamedays < values.shape[2])
+        found = values[np.where(valid, codes, 0), np.where(valid, seasons, 0), np.where(valid, gamedays, 0)]
+        return np.where(valid & ~np.isnan(found), found, default)
+
+    def final(self, teams, seasons, col, default=np.nan):
+        """
+        :col: of the final tables of :teams: in :seasons:, :default: where there is none
+        """
+        return self.lookup(teams, seasons, self.final_gameday, col, default)
+
+    def standingsBefore(self, teams, seasons, gamedays, leagues, past=5):
+        """
+        Table features of each team before a game on :gamedays: of :seasons: in :leagues: (1 or 2)
+            CurrentPoints, CurrentPosition, CurrentGoalDif, CurrentWin, CurrentDraws, CurrentLoss:
+                table after the previous gameday, all 0 on gameday 1 and NaN if there is no table entry
+            LastSeasonPosition, LastSeasonLeague: final table of last season, 3 if there is none
+            Past5YearsInThisLeague: 1 if the team played in the current league in all of the last :past:
+                seasons (seasons without final table count as league 3)
+
+        :teams: :seasons: :gamedays: :leagues: equally long arrays, teams are alias.json keys
+        """
+        teams = np.asarray(teams, dtype=object)
+        seasons = np.asarray(seasons, dtype=int)
+        gamedays = np.asarray(gamedays, dtype=int)
+        first_day = gamedays == 1
+
+        out = pd.DataFrame(index=np.arange(len(teams)))
+        for col, name in [("points", "CurrentPoints"), ("rank", "CurrentPosition"), ("diff", "CurrentGoalDif"),
+                          ("g", "CurrentWin"), ("u", "CurrentDraws"), ("v", "CurrentLoss")]:
+            out[name] = np.where(first_day, 0, self.lookup(teams, seasons, gamedays - 1, col))
+
+        # GameDay 1 has no previous table, league is current league
+        league = np.where(first_day, leagues, self.lookup(teams, seasons, gamedays - 1, "League"))
+
+        out["LastSeasonPosition"] = self.final(teams, seasons - 1, "rank", 3)
+        out["LastSeasonLeague"] = self.final(teams, seasons - 1, "League", 3)
+
+        # final leagues of the last seasons as one (teams, past) gather
+        past_leagues = self.final(teams[:, None], seasons[:, None] - np.arange(1, past+1), "League", 3)
+        out["Past{}YearsInThisLeague".format(past)] = (past_leagues == league[:, None]).all(axis=1).astype(int)
+
+        return out
+
+
+class CoachIndex(_BlockIndex):
+    """
+    Coach tenures (von, bis) of every team sorted by start, "coach in charge at date t" is the last tenure
+    that started before the day of t. Teams are the kicker url names of AllTeamCoaches.csv
+
+    :allCoaches: AllTeamCoaches.csv frame, von/bis as dd.mm.YYYY strings or already converted
+    """
+
+    def __init__(self, allCoaches):
+        coaches = allCoaches[["Team", "von", "bis"]].astype({"Team": object})
+        for col in ["von", "bis"]:
+            if not pd.api.types.is_datetime64_any_dtype(coaches[col]):
+                coaches[col] = pd.to_datetime(coaches[col], errors="coerce", format="%d.%m.%Y")
+        coaches = coaches[coaches["von"].notna()].sort_values(["Team", "von"], kind="mergesort")
+
+        self._indexBlocks(coaches["Team"].values, coaches["von"])
+        self.von = coaches["von"].values
+        self.bis = coaches["bis"].values
+
+    def tenure(self, teams, dates):
+        """
+        Start and end (NaT if unknown) of the tenure of the coach in charge at each date,
+        NaT for both if no coach of the team started before the day of the date
+
+        :teams: :dates: equally long arrays of kicker team names and datetimes
+        """
+        days = pd.to_datetime(pd.Series(dates)).dt.normalize()
+        pos, count = self.before(teams, days)
+        has = count > 0
+        return np.where(has, self.von[pos], np.datetime64("NaT")), np.where(has, self.bis[pos], np.datetime64("NaT"))
+
+    def daysSince(self, teams, dates, as_of=None):
+        """
+        Days between the day of each date and the start of the coach in charge (99999 if none known)
+
+        :as_of: array of datetimes, coach in charge at these (default :dates:)
+        """
+        start, _ = self.tenure(teams, dates if as_of is None else as_of)
+        days = pd.to_datetime(pd.Series(dates)).dt.normalize().values
+        return np.where(np.isnat(start), 99999, (days - start) // np.timedelta64(1, "D")).astype(int)
+
+    def gamesInCharge(self, teams, dates, timeline):
+        """
+        Number of games with result the coach in charge at each date led the team before that date (0 if none known)
+
+        :timeline: TeamTimeline of the same teams
+        """
+        start, _ = self.tenure(teams, dates)
+        _, before_date = timeline.before(teams, dates)
+        # NaT start counts no games
+        _, before_start = timeline.before(teams, start)
+        return np.where(np.isnat(start), 0, before_date - before_start)
+
+
+class CompetitionSet:
+    """
+    Boolean matrix (team, season, competition) of all competitions (Wettbewerb values, eg CL, EL, DFB-Pokal)
+    a team has games in, per season. Teams are the kicker url names of allTeamResults
+
+    :results: allTeamResults frame (Season is the season column of the results table)
+    """
+
+    def __init__(self, results):
+        entries = results[["Team", "Season", "Wettbewerb"]].dropna().astype({"Team": object, "Wettbewerb": object})
+        entries = entries.drop_duplicates()
+
+        self.teams = pd.Index(pd.unique(entries["Team"]))
+        self.competitions = pd.Index(np.sort(pd.unique(entries["Wettbewerb"])))
+        self.first_season = int(entries["Season"].min())
+
+        self.plays_in = np.zeros((len(self.teams), int(entries["Season"].max()) - self.first_season + 1,
+                                  len(self.competitions)), dtype=bool)
+        self.plays_in[self.teams.get_indexer(entries["Team"]),
+                      entries["Season"].values.astype(int) - self.first_season,
+                      self.competitions.get_indexer(entries["Wettbewerb"])] = True
+
+    def plays(self, teams, seasons, competition):
+        """
+        Boolean array, True where the team has games in :competition: in the season
+        (False for unknown teams, seasons and competitions)
+
+        :teams: :seasons: equally long arrays of kicker team names and seasons
+        """
+        codes = self.teams.get_indexer(np.asarray(teams, dtype=object))
+        seasons = np.asarray(seasons, dtype=int) - self.first_season
+        comp = self.competitions.get_indexer([competition])[0]
+
+        valid = (codes >= 0) & (seasons >= 0) & (seasons < self.plays_in.shape[1]) & (comp >= 0)
+        return valid & self.plays_in[np.where(valid, codes, 0), np.where(valid, seasons, 0), max(comp, 0)]
+
+    def candidates(self, teams, seasons, competitions=("CL", "EL")):
+        """
+        Frame with one 0/1 column <competition>_candidate per competition, eg CL_candidate, EL_candidate
+        """
+        return pd.DataFrame({comp + "_candidate": self.plays(teams, seasons, comp).astype(int)
+                             for comp in competitions})
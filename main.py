@@ -7,60 +7,9 @@ import pandas as pd
 
 import data_gathering
 import build_dfs
+import encoding
 import model
-
-
-def getVotes(i):
-    """
-    Run model i times, use most prevalent outputs for goals and goaldiff
-    """
-    goalList = []
-    diffList = []
-    for i in range(i):
-        
-        
-        #t1goals = max(t1goals, goaldiff) # account for cases, goaldiff is larger than shot goals
-        
-        t1goals_model = model.create_t1goals_model(ml_df_oh)
-        goaldiff_model = model.create_goaldiff_model(ml_df_oh)
-        
-        t1goals = t1goals_model.predict(row[1].values.reshape(1, -1))
-        goaldiff = goaldiff_model.predict(row[1].values.reshape(1, -1))
-    
-        t1goals = max(t1goals, goaldiff) 
-        
-        goalList.append(t1goals[0])
-        diffList.append(goaldiff[0])
-    
-    most_common_goal = max(set(goalList), key=goalList.count)    
-    most_common_diff = max(set(diffList), key=diffList.count)
-    
-    return [most_common_goal], [most_common_diff]
-
-
-
-def makeTeamsOneHot(df, colList=None):
-    """
-    Transforms columns Team1 and Team2 of passed DF into one-hot encoded vectors
-    For trainig data straightforward. For predict data some columns are missing 
-        (only half the teams present in predict data-set -> 
-             manually create dummy columns from colList, fill with 0)
-        
-    :colList: use column list from training ml dataset
-    """    
-    
-    one_hot_df = pd.get_dummies(df, columns=["Team1","Team2"])
-    
-    if colList is not None:
-        # remove y-variables from predicitive column list (they dont exist for future games)
-        colList = [x for x in colList if x not in ["Result_goaldiff", "Result_t1goals", "Team1_Home", "Team2_Home"] ]
-        for col in colList:
-            if col not in one_hot_df:
-                one_hot_df[col] = 0
-        
-        one_hot_df = one_hot_df[colList]
-    
-    return one_hot_df
+import registry
 
 
 def update_inputs(data_folder):
@@ -78,10 +27,16 @@ if __name__ == "__main__":
     league_1_gameday = 13 
     league_2_gameday = 15
     
+    # number of trees voting on each result, None uses a single tree per model
+    votes = None
+    
     
     # First update all data
     update_inputs(data_folder)   
     
+    # raw tables are read by build_dfs on first use
+    build_dfs.configure(data_folder=data_folder)
+    
     # then build new human and ml dataframe
     build_dfs.createHumanFrame(outFile=data_folder + "human_table.csv")
     build_dfs.build_ml_df(human_csv=data_folder + "human_table.csv", ml_csv=data_folder + "ml.csv")
@@ -89,13 +44,24 @@ if __name__ == "__main__":
     
     # # # SPLIT APPROACH # # #
     
-    # get training dataset, make teams one-hot
-    ml_df = pd.read_csv(data_folder + "ml.csv", sep=";")
-    ml_df_oh = makeTeamsOneHot(ml_df)
-    
-    # build models (for now, build new model for every run)    
-    t1goals_model = model.create_t1goals_model(ml_df_oh)
-    goaldiff_model = model.create_goaldiff_model(ml_df_oh)
+    # load models, they are only fit again if ml.csv changed; teams are one-hot encoded by an encoder 
+    # fit on the training data and stored with the model
+    model_registry = registry.ModelRegistry(data_folder + "models/")
+    if votes is None:
+        t1goals_entry = model_registry.fitOrLoad("t1goals", model.create_t1goals_model, data_folder + "ml.csv", 
+                                                 encoder=encoding.TeamEncoder())
+        goaldiff_entry = model_registry.fitOrLoad("goaldiff", model.create_goaldiff_model, data_folder + "ml.csv", 
+                                                  encoder=encoding.TeamEncoder())
+    else:
+        # will produce at lot of draws
+        t1goals_entry = model_registry.fitOrLoad("t1goals_votes", model.create_t1goals_ensemble, 
+                                                 data_folder + "ml.csv", encoder=encoding.TeamEncoder(), 
+                                                 params={"n_members": votes})
+        goaldiff_entry = model_registry.fitOrLoad("goaldiff_votes", model.create_goaldiff_ensemble, 
+                                                  data_folder + "ml.csv", encoder=encoding.TeamEncoder(), 
+                                                  params={"n_members": votes})
+    t1goals_model = t1goals_entry["model"]
+    goaldiff_model = goaldiff_entry["model"]
     
     
     # Create human df for upcoming games for both leagues
@@ -111,37 +77,21 @@ if __name__ == "__main__":
     ml_df1 = build_dfs.build_ml_df(human_csv=human_df_1, ml_csv=None)
     ml_df2 = build_dfs.build_ml_df(human_csv=human_df_2, ml_csv=None)
     
-    # convert predict mls to one-hot
-    ml_df1_oh = makeTeamsOneHot(ml_df1, colList = ml_df_oh.columns)
-    ml_df2_oh = makeTeamsOneHot(ml_df2, colList = ml_df_oh.columns)
-
+    # encode predict mls of both leagues with the training encoder (both models were fit on the same encoding)
+    X_predict = t1goals_entry["encoder"].transform(pd.concat([ml_df1, ml_df2]))
     
     
-    # feed predict arrays into models and return output
-    print("League 1 results for GameDay", league_1_gameday, "\n")
-    for row in ml_df1_oh.iterrows():
-        t1goals = t1goals_model.predict(row[1].values.reshape(1, -1))
-        goaldiff = goaldiff_model.predict(row[1].values.reshape(1, -1))
-        
-        t1goals = max(t1goals, goaldiff) # account for cases, goaldiff is larger than shot goals
-        
-        # will produce at lot of draws
-        #t1goals,goaldiff = getVotes(10)            
-        
-        team_str = human_df_1.iloc[row[0]]["Team1"] + " : " +  human_df_1.iloc[row[0]]["Team2"]
-        team_str = team_str + ''.join([" " for x in range(40 - len(team_str))] ) 
-        print(team_str + "\t--->\t", t1goals[0], ":", t1goals[0]-goaldiff[0])
-    
-    print("\nLeague 2 results for GameDay", league_2_gameday, "\n")
-    for row in ml_df2_oh.iterrows():
-        t1goals = t1goals_model.predict(row[1].values.reshape(1, -1))
-        goaldiff = goaldiff_model.predict(row[1].values.reshape(1, -1))
-        
-        t1goals = max(t1goals, goaldiff) # account for cases, goaldiff is larger than shot goals
-        
-        team_str = human_df_2.iloc[row[0]]["Team1"] + " : " +  human_df_2.iloc[row[0]]["Team2"]
-        team_str = team_str + ''.join([" " for x in range(40 - len(team_str))] ) 
-        print(team_str + "\t--->\t", t1goals[0], ":", t1goals[0]-goaldiff[0])
+    # feed predict arrays of both leagues into models at once
+    info_df = pd.concat([human_df_1[["Team1", "Team2"]].assign(League=1, GameDay=league_1_gameday),
+                         human_df_2[["Team1", "Team2"]].assign(League=2, GameDay=league_2_gameday)])
+    results = model.predict_results(t1goals_model, goaldiff_model, X_predict, info_df)
+    
+    for league, gameday in [(1, league_1_gameday), (2, league_2_gameday)]:
+        print("\nLeague", league, "results for GameDay", gameday, "\n")
+        for game in results[results["League"] == league].itertuples():
+            team_str = game.Team1 + " : " +  game.Team2
+            team_str = team_str + ''.join([" " for x in range(40 - len(team_str))] ) 
+            print(team_str + "\t--->\t", game.T1Goals, ":", game.T2Goals)
         
 
     # # # CATEGORIACL APPROACH # # #
@@ -6,6 +6,8 @@ import numpy as np
 import pandas as pd
 import xgboost as xgb
 
+from joblib import Parallel, delayed
+
 import matplotlib.pyplot as plt
 
 from sklearn.model_selection import train_test_split
@@ -20,19 +22,26 @@ from sklearn.tree import DecisionTreeClassifier
 #ml_df = pd.read_csv("E:/Test/ml.csv", sep=";")
 
 
-def create_t1goals_model(ml_df, silent=0):
+def create_t1goals_model(ml_df, silent=0, params=None, X=None):
+    """
+    Decision tree predicting goals of Team1
+    
+    :params: hyperparameters passed to DecisionTreeClassifier
+    :X: feature matrix of ml_df (eg sparse from encoding.TeamEncoder), default ml_df without the result columns
+    """
     # create new dfs with exactly one output variable
     ml_df_g1 = ml_df.drop("Result_goaldiff", axis=1)
 
     # define X, Y... basically remove Y from X, transform both to arrays
     Y = ml_df_g1["Result_t1goals"].values
-    X = ml_df_g1.drop("Result_t1goals", axis=1).values
+    if X is None:
+        X = ml_df_g1.drop("Result_t1goals", axis=1).values
         
     test_size = 0.001
     X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=test_size)
 
     # fit model no training data
-    model = DecisionTreeClassifier().fit(X_train, y_train)
+    model = DecisionTreeClassifier(**(params or {})).fit(X_train, y_train)
 
     # make predictions for test data
     y_pred = model.predict(X_test)
@@ -50,19 +59,26 @@ def create_t1goals_model(ml_df, silent=0):
     #print(dict(zip(unique, pcount )))
 
 
-def create_goaldiff_model(ml_df,silent=0):
+def create_goaldiff_model(ml_df,silent=0, params=None, X=None):
+    """
+    Decision tree predicting goal difference (negative if team 1 lost)
+    
+    :params: hyperparameters passed to DecisionTreeClassifier
+    :X: feature matrix of ml_df (eg sparse from encoding.TeamEncoder), default ml_df without the result columns
+    """
     # create new dfs with exactly one output variable
     ml_df_diff = ml_df.drop("Result_t1goals", axis=1)
     
     # define X, Y... basically remove Y from X, transform both to arrays
     Y = ml_df_diff["Result_goaldiff"].values
-    X = ml_df_diff.drop("Result_goaldiff", axis=1).values
+    if X is None:
+        X = ml_df_diff.drop("Result_goaldiff", axis=1).values
     
     test_size = 0.001
     X_train, X_test, y_train, y_test = train_test_split(X, Y, test_size=test_size)
 
     # fit model no training data
-    model = DecisionTreeClassifier()
+    model = DecisionTreeClassifier(**(params or {}))
     model.fit(X_train, y_train)
 
     # make predictions for test data
@@ -78,6 +94,76 @@ def create_goaldiff_model(ml_df,silent=0):
 
 
 
+# # # # # # # # # VOTING ENSEMBLE # # # # # # # # #
+
+class VotingEnsemble:
+    """
+    Randomized decision trees that predict by majority vote (mode of all member predictions)
+    Has the predict() of a single tree, so it can be used in place of the create_*_model models
+    """
+    
+    def __init__(self, members):
+        self.members = members
+    
+    def predict(self, X):
+        # one predict call per member for all rows, votes has shape (members, rows)
+        votes = np.stack([m.predict(X) for m in self.members])
+        
+        # count votes per class and row, most votes wins (smallest class on ties)
+        classes = np.unique(votes)
+        counts = (votes[:, :, None] == classes[None, None, :]).sum(axis=0)
+        return classes[counts.argmax(axis=1)]
+
+
+def _fit_member(X, Y, seed, sample, tree_params):
+    """
+    Fit one tree of the ensemble on a random :sample: share of the rows
+    """
+    rng = np.random.RandomState(seed)
+    rows = rng.choice(len(Y), size=max(1, int(len(Y) * sample)), replace=False)
+    return DecisionTreeClassifier(random_state=seed, **tree_params).fit(X[rows], Y[rows])
+
+
+def create_ensemble(ml_df, target, params=None, n_jobs=-1, X=None):
+    """
+    Fit a VotingEnsemble for :target: ("Result_t1goals" or "Result_goaldiff"), members are fit in parallel
+    
+    :params: n_members (default 100) number of trees, sample (default 0.999) share of rows each tree is fit on
+             (same as the test split of create_t1goals_model), seed (default 0); all other keys are passed 
+             to DecisionTreeClassifier
+    :n_jobs: number of processes, -1 uses all cores
+    :X: feature matrix of ml_df (eg sparse from encoding.TeamEncoder), default ml_df without the result columns
+    """
+    params = dict(params or {})
+    n_members = params.pop("n_members", 100)
+    sample = params.pop("sample", 0.999)
+    seed = params.pop("seed", 0)
+    
+    # define X, Y... remove both results from X
+    Y = ml_df[target].values
+    if X is None:
+        X = ml_df.drop(["Result_t1goals", "Result_goaldiff"], axis=1).values
+    
+    members = Parallel(n_jobs=n_jobs)(delayed(_fit_member)(X, Y, seed + i, sample, params) 
+                                      for i in range(n_members))
+    return VotingEnsemble(members)
+
+
+def create_t1goals_ensemble(ml_df, silent=0, params=None, X=None):
+    """
+    VotingEnsemble predicting goals of Team1, see create_ensemble() for :params: and :X:
+    """
+    return create_ensemble(ml_df, "Result_t1goals", params, X=X)
+
+
+def create_goaldiff_ensemble(ml_df, silent=0, params=None, X=None):
+    """
+    VotingEnsemble predicting goal difference, see create_ensemble() for :params: and :X:
+    """
+    return create_ensemble(ml_df, "Result_goaldiff", params, X=X)
+
+
+
 def create_categorical_tree(hum_df, silent=0):
     """
     NOT WORKING, NEED TO ONEHOT ENCODE
@@ -118,6 +204,29 @@ def predict_outcome(model, inData):
     return model.predict(inData.reshape(1,-1))[0]
 
 
+def predict_results(t1goals_model, goaldiff_model, predict_df, info_df=None):
+    """
+    Predicts all games of :predict_df: with one predict call per model, any number of leagues, gamedays or seasons
+    Goals of Team1 are raised to the goal difference where the goaldiff model predicts the larger value
+    
+    :predict_df: feature matrix or frame with the columns the models were fit on (encoding.TeamEncoder.transform())
+    :info_df: frame with one row per row of :predict_df: (same order), its columns are copied to the 
+              output, eg Team1, Team2, League, GameDay
+    
+    returns frame with columns of :info_df: and T1Goals, T2Goals, GoalDiff
+    """
+    X = predict_df.values if isinstance(predict_df, pd.DataFrame) else predict_df
+    goaldiff = goaldiff_model.predict(X)
+    
+    # account for cases, goaldiff is larger than shot goals
+    t1goals = np.maximum(t1goals_model.predict(X), goaldiff)
+    
+    results = pd.DataFrame({"T1Goals": t1goals, "T2Goals": t1goals - goaldiff, "GoalDiff": goaldiff})
+    if info_df is not None:
+        results = pd.concat([info_df.reset_index(drop=True), results], axis=1)
+    return results
+
+
 
 
 
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+
+# stores fitted models on disk, a model is only fit again if ml.csv or its hyperparameters changed
+
+import hashlib
+import os
+import pickle
+
+import storage
+
+
+def fingerprint(ml_csv):
+    """
+    sha1 of the content of :ml_csv:, identifies the training data a model was fit on
+    """
+    sha = hashlib.sha1()
+    with open(ml_csv, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+class ModelRegistry:
+    """
+    Folder of pickled models, one file per model name. Each entry is a dict of
+        model:           the fitted model
+        feature_columns: columns of the training frame the model was fit on (without the Result_ columns),
+                         predict frames must have exactly these columns
+        encoder:         fitted encoding.TeamEncoder turning predict frames into the model features, or None
+        fingerprint:     fingerprint() of the ml.csv used for training
+        params:          hyperparameters passed to the create function
+
+    :folder: folder of the model files, created if missing
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+        # training frame, feature matrix and encoder per fingerprint, built once for all models fit in one run
+        self._training = {}
+
+    def _file(self, name):
+        return os.path.join(self.folder, name + ".pkl")
+
+    def load(self, name, fingerprint=None, params=None):
+        """
+        Returns entry of model :name:, None if there is none or it was fit on other data (:fingerprint:)
+        or with other hyperparameters (:params:)
+        """
+        try:
+            with open(self._file(name), "rb") as f:
+                entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+
+        if fingerprint is not None and entry["fingerprint"] != fingerprint:
+            return None
+        if entry["params"] != (params or {}):
+            return None
+        return entry
+
+    def save(self, name, model, feature_columns, fingerprint, params=None, encoder=None):
+        """
+        Stores fitted :model: as :name:, returns the entry
+        """
+        entry = {"model": model,
+                 "feature_columns": list(feature_columns),
+                 "encoder": encoder,
+                 "fingerprint": fingerprint,
+                 "params": params or {}}
+
+        # write to temporary file first, so a crash never leaves a broken model file
+        with open(self._file(name) + ".tmp", "wb") as f:
+            pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(self._file(name) + ".tmp", self._file(name))
+        return entry
+
+    def fitOrLoad(self, name, create, ml_csv, prepare=None, params=None, encoder=None):
+        """
+        Returns entry of model :name:, fits and stores it only if ml.csv or :params: changed since the last fit
+
+        :create: model creating function, eg model.create_t1goals_model, called as 
+                 create(training_df, params=params, X=X) with X the encoded training data (None without :encoder:)
+        :ml_csv: training data
+        :prepare: function applied to the read ml.csv before training
+        :params: hyperparameters of the model
+        :encoder: not fitted encoder (eg encoding.TeamEncoder()), fit on the training data and stored with the model
+        """
+        ml_fingerprint = fingerprint(ml_csv)
+        entry = self.load(name, ml_fingerprint, params)
+        # models stored without encoder were fit on other features
+        if entry is not None and (encoder is None or entry.get("encoder") is not None):
+            return entry
+
+        print("Fitting model", name)
+        if ml_fingerprint not in self._training:
+            training_df = storage.readCsv("ml", ml_csv)
+            training_df = prepare(training_df) if prepare is not None else training_df
+            self._training = {ml_fingerprint: {"df": training_df, "encoded": {}}}
+        training = self._training[ml_fingerprint]
+        training_df = training["df"]
+
+        X = None
+        if encoder is not None:
+            # models with the same kind of encoder share one fitted encoder and matrix
+            key = type(encoder).__name__
+            if key not in training["encoded"]:
+                training["encoded"][key] = (encoder, encoder.fit_transform(training_df))
+            encoder, X = training["encoded"][key]
+            feature_columns = encoder.columns()
+        else:
+            feature_columns = [c for c in training_df.columns if c not in ["Result_t1goals", "Result_goaldiff"]]
+
+        model = create(training_df, params=params, X=X)
+        return self.save(name, model, feature_columns, ml_fingerprint, params, encoder)
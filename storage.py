@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+"""
+Typed columnar storage (parquet) for the data_gathering.py tables and the built frames
+
+Each table is a folder inside the data folder, holding one parquet file per partition, eg.
+    AllTables/Season=17_League=1.parquet
+
+so an update of the current season only rewrites the files of the current season.
+Needs pyarrow installed (pandas parquet engine).
+
+To switch an existing data folder from csv, run migrateCsv() once. context.DataContext
+reads the parquet store if it exists, the csv files otherwise. Both are loaded with the column types
+declared in TABLES (categories, small integers, dates), see typed() and readCsv().
+The built frames (human_table, ml, "store": False) stay csv files and are only read typed through readCsv().
+"""
+
+import glob
+import os
+
+import pandas as pd
+
+
+# x:y score columns of human_table, build_dfs.build_ml_df() splits each into <col>_t1goals and <col>_goaldiff
+SCORE_COLUMNS = ["Result", "LastDirectGame1", "LastDirectGame2", "LastDirectGame3",
+                 "LastGameTeam1_1", "LastGameTeam1_2", "LastGameTeam1_3", "LastGameTeam1_4", "LastGameTeam1_5",
+                 "LastGameTeam2_1", "LastGameTeam2_2", "LastGameTeam2_3", "LastGameTeam2_4", "LastGameTeam2_5"]
+
+# integer features of human_table and ml, day counts use 99999 for "never" and need int32
+_GAME_INT = {"CurLeague": "int8", "Team1_Home": "int8", "Team2_Home": "int8", "GameTimeOfDay": "int16",
+             "GameWeekday": "int8", "GameDay": "int8",
+             "LastDirectGame1_time": "int32", "LastDirectGame2_time": "int32", "LastDirectGame3_time": "int32"}
+
+# integer features existing once per team, stored as <col>1 and <col>2
+_TEAM_INT = {"GamesSinceLastWin": "int16", "TimeSinceLastGame": "int32", "LastGameOverTime": "int8",
+             "TimeSinceLastCoach": "int32", "CurrentPoints": "int16", "CurrentPosition": "int8",
+             "CurrentGoalDif": "int16", "CurrentWin": "int8", "CurrentDraws": "int8", "CurrentLoss": "int8",
+             "LastSeasonPosition": "int8", "LastSeasonLeague": "int8", "Past5YearsInThisLeague": "int8",
+             "CL_candidate": "int8", "EL_candidate": "int8"}
+
+_FEATURE_INT = dict(_GAME_INT, **{col + team: dtype for col, dtype in _TEAM_INT.items() for team in ["1", "2"]})
+
+
+# per table: csv file name, kept in the parquet store (or csv only), partition columns, categorical columns,
+# small integer columns, date columns with format
+TABLES = {
+    "AllTeamPages": {"csv": "AllTeamPages.csv",
+                     "store": True,
+                     "partition": ["Season", "League"],
+                     "category": ["Team", "url_Teamname"],
+                     "int": {"Season": "int16", "League": "int8"},
+                     "date": {"Retrieve_Date": "%Y-%m-%d"}},
+
+    "AllTeamResults": {"csv": "AllTeamResults.csv",
+                       "store": True,
+                       "partition": ["Season"],
+                       "category": ["Team", "Gegner", "Wettbewerb", "Spt./Runde", "Termin", "Wo", "Score"],
+                       "int": {"Season": "int16", "Overtime": "int8"},
+                       "date": {"Retrieve_Date": "%Y-%m-%d"}},
+
+    "AllTables": {"csv": "AllTables.csv",
+                  "store": True,
+                  "partition": ["Season", "League"],
+                  "category": ["Team", "tore"],
+                  "int": {"Season": "int16", "League": "int8", "GameDay": "int8", "rank": "int8", "sp": "int8",
+                          "g": "int8", "u": "int8", "v": "int8", "diff": "int16", "points": "int16"},
+                  "date": {"Retrieve_Date": "%Y-%m-%d"}},
+
+    "AllTeamCoaches": {"csv": "AllTeamCoaches.csv",
+                       "store": True,
+                       "partition": [],
+                       "category": ["Team", "Vorname", "Nachname", "Nationalität"],
+                       "int": {},
+                       "date": {"Retrieve_Date": "%Y-%m-%d", "Geboren": "%d.%m.%Y",
+                                "von": "%d.%m.%Y", "bis": "%d.%m.%Y"}},
+
+    "human_table": {"csv": "human_table.csv",
+                    "store": False,
+                    "partition": [],
+                    "category": ["Team1", "Team2"] + SCORE_COLUMNS,
+                    "int": _FEATURE_INT,
+                    "date": {"Retrieve_Date": "%Y-%m-%d", "Game_Date": "%Y-%m-%d"}},
+
+    # Team1/Team2 are kicker team ids
+    "ml": {"csv": "ml.csv",
+           "store": False,
+           "partition": [],
+           "category": [],
+           "int": dict(_FEATURE_INT, Team1="int32", Team2="int32",
+                       **{col + part: "int8" for col in SCORE_COLUMNS for part in ["_t1goals", "_goaldiff"]}),
+           "date": {}},
+}
+
+
+# # # # # # # # # HELPER FUNCTIONS # # # # # # # # #
+
+def typed(df, name):
+    """
+    Returns copy of :df: with the column types of table :name:
+    AllTeamResults additionally gets a parsed Date and integer goal columns T1Goals/T2Goals (<NA> if not played)
+    """
+    spec = TABLES[name]
+
+    # drop index columns written by earlier to_csv calls
+    df = df.drop(columns=[c for c in df.columns if str(c).startswith("Unnamed:")])
+
+    for col, fmt in spec["date"].items():
+        if col in df.columns and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = pd.to_datetime(df[col], errors="coerce", format=fmt)
+
+    for col, dtype in spec["int"].items():
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors="coerce")
+            # nullable integer if values are missing
+            df[col] = values.astype(dtype if values.notna().all() else dtype.capitalize())
+
+    for col in spec["category"]:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+
+    if name == "AllTeamResults" and "Score" in df.columns:
+        # only the few distinct scores are parsed, rows take their goals by category code ("-:-" is <NA>)
+        scores = df["Score"].cat
+        goals = scores.categories.astype(str).str.partition(":")
+        for col, level in [("T1Goals", 0), ("T2Goals", 2)]:
+            values = pd.to_numeric(goals.get_level_values(level), errors="coerce")
+            df[col] = pd.array(values, dtype="Int8").take(scores.codes.values, allow_fill=True)
+        df["Date"] = pd.to_datetime(df["Termin"].str.slice(4), errors='coerce', format='%d.%m.%y %H:%M')
+
+    return df
+
+
+def memoryUsage(df):
+    """
+    Deep memory usage of :df: in MB, object columns are counted with their strings
+    """
+    return df.memory_usage(index=True, deep=True).sum() / 1e6
+
+
+def _tableFolder(name, folder):
+    return os.path.join(folder, name)
+
+
+def _partitionFile(name, folder, values):
+    """
+    File of one partition, :values: are the values of the partition columns
+    """
+    parts = ["{}={}".format(col, val) for col, val in zip(TABLES[name]["partition"], values)]
+    file_name = "_".join(parts) if len(parts) > 0 else "all"
+    return os.path.join(_tableFolder(name, folder), file_name + ".parquet")
+
+
+def _partitionValues(path):
+    """
+    Returns dict of partition column -> value parsed from a partition file name
+    """
+    file_name = os.path.splitext(os.path.basename(path))[0]
+    if file_name == "all":
+        return {}
+    return {part.split("=")[0]: int(part.split("=")[1]) for part in file_name.split("_")}
+
+
+def _partitions(df, name):
+    """
+    Yields (partition values, rows) of :df:
+    """
+    partition = TABLES[name]["partition"]
+    if len(partition) == 0:
+        yield (), df
+    else:
+        for values, rows in df.groupby(partition, sort=True, observed=True):
+            if not isinstance(values, tuple):
+                values = (values,)
+            yield values, rows
+
+
+# # # # # # # # # READ / WRITE # # # # # # # # #
+
+def exists(name, folder):
+    """
+    True if table :name: is stored in :folder:
+    """
+    return len(glob.glob(os.path.join(_tableFolder(name, folder), "*.parquet"))) > 0
+
+
+def readTable(name, folder, **filters):
+    """
+    Reads table :name: from :folder:, only partitions matching :filters: if passed,
+    eg readTable("AllTables", folder, Season=[17, 18])
+    """
+    files = sorted(glob.glob(os.path.join(_tableFolder(name, folder), "*.parquet")))
+
+    for col, values in filters.items():
+        files = [f for f in files if _partitionValues(f).get(col) in values]
+
+    if len(files) == 0:
+        return typed(pd.DataFrame(), name)
+
+    df = pd.concat([pd.read_parquet(f) for f in files], ignore_index=True)
+
+    # categories differ between partitions, concat turns them into object columns again
+    return typed(df, name)
+
+
+def readCsv(name, path, chunksize=None):
+    """
+    Reads csv file :path: of table :name: with the column types of TABLES
+
+    :chunksize: if set, returns a generator of typed frames of this many rows each
+    """
+    if chunksize is not None:
+        return (typed(chunk, name) for chunk in pd.read_csv(path, sep=";", encoding="utf8", chunksize=chunksize))
+    return typed(pd.read_csv(path, sep=";", encoding="utf8"), name)
+
+
+def writeTable(df, name, folder):
+    """
+    Replaces table :name: in :folder: completely with :df:
+    New partitions are written first, files of partitions not in :df: are removed afterwards, so a crash
+    never leaves the table empty
+    """
+    stale = set(glob.glob(os.path.join(_tableFolder(name, folder), "*.parquet")))
+    stale -= set(writePartitions(df, name, folder))
+    for f in stale:
+        os.remove(f)
+
+
+def writePartitions(df, name, folder):
+    """
+    Replaces only the partitions contained in :df:, all other partitions stay untouched
+    Returns list of the written files
+    """
+    os.makedirs(_tableFolder(name, folder), exist_ok=True)
+    df = typed(df, name)
+
+    written = []
+    for values, rows in _partitions(df, name):
+        path = _partitionFile(name, folder, values)
+        # write to temporary file first, so a crash never leaves a broken partition
+        rows.to_parquet(path + ".tmp", index=False)
+        os.replace(path + ".tmp", path)
+        written.append(path)
+    return written
+
+
+def appendRows(df, name, folder, subset=None):
+    """
+    Appends :df: to table :name:, only partitions contained in :df: are read and rewritten
+
+    :subset: columns identifying a row, rows already stored are replaced by the ones of :df:
+    """
+    df = typed(df, name)
+    out = []
+
+    for values, rows in _partitions(df, name):
+        path = _partitionFile(name, folder, values)
+        if os.path.exists(path):
+            rows = pd.concat([typed(pd.read_parquet(path), name), rows], ignore_index=True)
+            if subset is not None:
+                rows = rows.drop_duplicates(subset=subset, keep="last")
+        out.append(rows)
+
+    if len(out) > 0:
+        writePartitions(pd.concat(out, ignore_index=True), name, folder)
+
+
+def migrateCsv(csv_folder, store_folder=None):
+    """
+    One-shot conversion of all csv files of store tables found in :csv_folder: into the parquet store
+
+    :store_folder: defaults to :csv_folder:
+    """
+    store_folder = store_folder if store_folder is not None else csv_folder
+
+    for name, spec in TABLES.items():
+        csv_file = os.path.join(csv_folder, spec["csv"])
+        if not spec["store"]:
+            continue
+        if not os.path.exists(csv_file):
+            print(spec["csv"], "not found, skipped")
+            continue
+
+        writeTable(pd.read_csv(csv_file, sep=";", encoding="utf8"), name, store_folder)
+        print(spec["csv"], "migrated")
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# synthetic kicker-like history (data_gathering.py output layout) shared by all tests
+
+import json
+import os
+import sys
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import context  # noqa: E402
+
+
+WEEKDAYS = ["Mo", "Di", "Mi", "Do", "Fr", "Sa", "So"]
+
+
+def _termin(date):
+    return WEEKDAYS[date.weekday()] + ", " + date.strftime("%d.%m.%y %H:%M")
+
+
+def _rounds(teams):
+    """
+    Double round robin, returns list of gamedays, each a list of (home, away)
+    """
+    n = len(teams)
+    rotation = list(teams)
+    first_half = []
+    for _ in range(n - 1):
+        first_half.append([(rotation[i], rotation[n - 1 - i]) for i in range(n // 2)])
+        rotation = [rotation[0], rotation[-1]] + rotation[1:-1]
+    return first_half + [[(away, home) for home, away in gameday] for gameday in first_half]
+
+
+def writeHistory(folder, seasons=(4, 5), unplayed_from=30, seed=1):
+    """
+    Writes AllTeamResults.csv, AllTables.csv, AllTeamPages.csv and AllTeamCoaches.csv of two leagues with
+    18 teams each for :seasons: into :folder:. Gamedays from :unplayed_from: of the last season have no result
+    yet. Two teams move between the leagues after every season, some teams also play CL/EL and the cup
+    """
+    rng = np.random.RandomState(seed)
+    with open(os.path.join(ROOT, "alias.json"), "r", encoding="utf8") as j:
+        alias_json = json.load(j)
+    names = list(alias_json)
+    kicker = {name: [n for n in alias_json[name] if "-" in n][0] for name in names}
+
+    leagues = {1: names[:18], 2: names[18:36]}
+    results, tables, pages = [], [], []
+
+    for season in seasons:
+        for league, teams in leagues.items():
+            start = datetime(2000 + season, 8, 10, 15, 30)
+            stand = {team: dict(sp=0, g=0, u=0, v=0, gf=0, ga=0, points=0) for team in teams}
+
+            for gameday, games in enumerate(_rounds(teams), 1):
+                played = season != seasons[-1] or gameday < unplayed_from
+                for k, (home, away) in enumerate(games):
+                    date = start + timedelta(days=7 * (gameday - 1) + k % 3, hours=3 * (k % 2) + league - 1)
+                    goals_home, goals_away = rng.poisson(1.5), rng.poisson(1.1)
+                    for team, opponent, wo, own, other in [(home, away, "H", goals_home, goals_away),
+                                                           (away, home, "A", goals_away, goals_home)]:
+                        results.append({"Retrieve_Date": "2018-01-01", "Team": kicker[team], "Season": season,
+                                        "Gegner": opponent, "Wettbewerb": "BL" if league == 1 else "2.BL",
+                                        "Spt./Runde": "{}. Spt.".format(gameday), "Termin": _termin(date),
+                                        "Wo": wo, "Score": "{}:{}".format(own, other) if played else "-:-",
+                                        "Overtime": 0})
+                        if played:
+                            entry = stand[team]
+                            entry["sp"] += 1
+                            entry["gf"] += own
+                            entry["ga"] += other
+                            entry["g" if own > other else "u" if own == other else "v"] += 1
+                            entry["points"] += 3 if own > other else 1 if own == other else 0
+
+                if not played:
+                    continue
+                ranked = sorted(teams, key=lambda t: (-stand[t]["points"], stand[t]["ga"] - stand[t]["gf"], t))
+                for rank, team in enumerate(ranked, 1):
+                    entry = stand[team]
+                    tables.append({"Retrieve_Date": "2018-01-01", "Season": season, "League": league,
+                                   "GameDay": gameday, "rank": rank, "Team": team, "sp": entry["sp"],
+                                   "g": entry["g"], "u": entry["u"], "v": entry["v"],
+                                   "tore": "{}:{}".format(entry["gf"], entry["ga"]),
+                                   "diff": entry["gf"] - entry["ga"], "points": entry["points"]})
+
+            for team in teams:
+                pages.append({"Retrieve_Date": "2018-01-01", "Season": season, "League": league, "Team": team,
+                              "url_Teamname": kicker[team],
+                              "Team_URL": "http://www.kicker.de/news/fussball/bundesliga/vereine/{}-bundesliga/"
+                                          "20{:02d}-{:02d}/{}/vereinsinformationen.html".format(
+                                              league, season, season + 1, kicker[team])})
+
+        # european games of the top teams and one cup round with an overtime draw
+        for i, team in enumerate(leagues[1][:6]):
+            for week in range(3):
+                date = datetime(2000 + season, 9, 15 + 7 * week, 20, 45)
+                results.append({"Retrieve_Date": "2018-01-01", "Team": kicker[team], "Season": season,
+                                "Gegner": "Foreign FC", "Wettbewerb": "CL" if i < 3 else "EL",
+                                "Spt./Runde": "Gruppe", "Termin": _termin(date), "Wo": "H",
+                                "Score": "{}:{}".format(rng.randint(4), rng.randint(4)), "Overtime": 0})
+        for k, team in enumerate(leagues[1] + leagues[2]):
+            results.append({"Retrieve_Date": "2018-01-01", "Team": kicker[team], "Season": season,
+                            "Gegner": "Amateur SV", "Wettbewerb": "DFB", "Spt./Runde": "1. Runde",
+                            "Termin": _termin(datetime(2000 + season, 8, 3, 18, 30)), "Wo": "A",
+                            "Score": "1:1" if k % 4 == 0 else "2:1", "Overtime": int(k % 4 == 0)})
+
+        leagues[1][-2:], leagues[2][:2] = leagues[2][:2], leagues[1][-2:]
+
+    coaches = []
+    for name in names:
+        start = datetime(2003, 7, 1)
+        while start < datetime(2000 + seasons[-1] + 1, 7, 1):
+            end = start + timedelta(days=int(rng.randint(200, 900)))
+            coaches.append({"Retrieve_Date": "2018-01-01", "Team": kicker[name], "Vorname": "A",
+                            "Nachname": "N{}".format(len(coaches)), "Geboren": "01.01.1960",
+                            "Nationalität": "D", "von": start.strftime("%d.%m.%Y"), "bis": end.strftime("%d.%m.%Y")})
+            start = end
+
+    # stored tables are not sorted by game
+    results = pd.DataFrame(results).sample(frac=1, random_state=seed).reset_index(drop=True)
+    for df, file_name in [(results, "AllTeamResults.csv"), (pd.DataFrame(tables), "AllTables.csv"),
+                          (pd.DataFrame(pages), "AllTeamPages.csv"), (pd.DataFrame(coaches), "AllTeamCoaches.csv")]:
+        df.to_csv(os.path.join(folder, file_name), sep=";")
+
+
+@pytest.fixture(scope="session")
+def history(tmp_path_factory):
+    """
+    Folder with the synthetic history csv files
+    """
+    folder = tmp_path_factory.mktemp("history")
+    writeHistory(str(folder))
+    return str(folder)
+
+
+@pytest.fixture(scope="session")
+def data_context(history):
+    return context.DataContext(data_folder=history)
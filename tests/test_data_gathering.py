@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pandas as pd
+import pytest
+
+import data_gathering
+import storage
+
+
+@pytest.mark.parametrize("name", list(data_gathering.TABLE_SPECS))
+def test_session_save_roundtrip_store(history, tmp_path, name):
+    """
+    A row added through ScrapeSession is written to the parquet store, all other rows stay
+    """
+    collist = data_gathering.TABLE_SPECS[name]["collist"]
+    raw = pd.read_csv(os.path.join(history, storage.TABLES[name]["csv"]), sep=";", encoding="utf8")[collist]
+    storage.writeTable(raw.iloc[:-1], name, str(tmp_path))
+
+    csv_file = os.path.join(str(tmp_path), storage.TABLES[name]["csv"])
+    session = data_gathering.ScrapeSession({name: csv_file})
+    session.add(name, [raw.iloc[-1].to_dict()])
+    session.save()
+
+    assert not os.path.exists(csv_file + ".journal")
+    assert not os.path.exists(csv_file)
+
+    stored = storage.readTable(name, str(tmp_path))[collist]
+    expected = storage.typed(raw, name)[collist]
+    stored, expected = [df.astype(str).sort_values(collist).reset_index(drop=True) for df in (stored, expected)]
+    pd.testing.assert_frame_equal(stored, expected)
+
+
+def test_gamedays_to_fetch(history):
+    tables = pd.read_csv(os.path.join(history, "AllTables.csv"), sep=";", encoding="utf8")
+    tables = tables[(tables["Season"] == 5) & (tables["League"] == 1)]
+
+    # tables up to gameday 29 are stored and final, only the next gameday is fetched
+    assert data_gathering.gameDaysToFetch(tables, 30, 29) == [30]
+
+    # gameday 10 with a postponed game: fetched again shortly after, not anymore many gamedays later
+    postponed = tables.copy()
+    postponed.loc[(postponed["GameDay"] == 10) & (postponed["rank"] == 1), "sp"] = 9
+    assert data_gathering.gameDaysToFetch(postponed, 13, 12) == [10]
+    assert data_gathering.gameDaysToFetch(postponed, 30, 29) == [30]
+
+    # missing tables are always fetched
+    assert data_gathering.gameDaysToFetch(tables[tables["GameDay"] != 3], 30, 29) == [3, 30]
+
+
+class _RecordingPool:
+    """
+    Fetcher returning no pages, remembers the requested urls
+    """
+
+    def __init__(self):
+        self.urls = []
+
+    def fetchAll(self, urls):
+        self.urls += list(urls)
+        return {}
+
+
+def test_team_list_from_store(history, tmp_path, monkeypatch):
+    """
+    updateAll() steps read the team list of the current season from the parquet store, the csv next to it
+    is stale (only last season) after the store was created
+    """
+    monkeypatch.setattr(data_gathering, "getCurrentSeason", lambda: 5)
+    pages_csv = os.path.join(history, "AllTeamPages.csv")
+    teams = pd.read_csv(pages_csv, sep=";", encoding="utf8")
+    storage.writeTable(teams, "AllTeamPages", str(tmp_path))
+    teams[teams["Season"] == 4].to_csv(str(tmp_path / "AllTeamPages.csv"), sep=";")
+
+    current = teams[teams["Season"] == 5]["Team_URL"]
+    session = data_gathering.ScrapeSession({name: str(tmp_path / storage.TABLES[name]["csv"])
+                                            for name in data_gathering.TABLE_SPECS})
+
+    pool = _RecordingPool()
+    data_gathering.teamResultsBuilder(str(tmp_path / "AllTeamPages.csv"), mode='u', session=session, pool=pool)
+    assert pool.urls == [data_gathering.teamPageUrl(url, "vereinstermine.html") for url in current]
+
+    pool = _RecordingPool()
+    data_gathering.getCoaches(str(tmp_path / "AllTeamPages.csv"), mode='u', session=session, pool=pool)
+    assert sorted(pool.urls) == sorted(data_gathering.teamPageUrl(url, "trainer.html") for url in current)
+
+    # store only folder, own sessions of the steps
+    os.remove(str(tmp_path / "AllTeamPages.csv"))
+    pool = _RecordingPool()
+    data_gathering.teamResultsBuilder(str(tmp_path / "AllTeamPages.csv"), mode='u',
+                                      outCsv=str(tmp_path / "AllTeamResults.csv"), pool=pool)
+    assert len(pool.urls) == len(current)
+
+
+def test_page_parsable():
+    url = data_gathering.tableUrl(18, 1, 20)
+    table = '<html><body><div id="ctl00_PlaceHolderContent_x"><table summary="Tabelle" class="tStat"></table></div>'
+    not_played = '<html><body><div id="ctl00_PlaceHolderContent_spieltag">Spiele</div></body></html>'
+    script = '<html><body><div id="app"></div><script src="app.js"></script></body></html>'
+
+    assert data_gathering.pageParsable(url, table)
+    # gameday not played yet, no browser needed
+    assert data_gathering.pageParsable(url, not_played)
+    assert data_gathering.parseTable(not_played, 18, 1, 20) is None
+    # content rendered by JavaScript
+    assert not data_gathering.pageParsable(url, script)
+    # team pages still need their table
+    assert not data_gathering.pageParsable("http://www.kicker.de/a/vereinstermine.html", not_played)
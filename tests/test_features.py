@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import benchmarks
+import build_dfs
+from conftest import writeHistory
+
+
+# direct game ages of the legacy loop mix Berlin and UTC times, so they are off by a day across DST changes
+TIME_COLUMNS = ["LastDirectGame1_time", "LastDirectGame2_time", "LastDirectGame3_time"]
+
+
+@pytest.fixture
+def configured(history):
+    """
+    build_dfs reading the synthetic history, restored after the test
+    """
+    old = build_dfs.data_context
+    build_dfs.configure(data_folder=history)
+    yield build_dfs.data_context
+    build_dfs.data_context = old
+
+
+def _readHuman(csv_file):
+    df = pd.read_csv(csv_file, sep=";", encoding="utf8").drop(columns=["Retrieve_Date"])
+    df.index = benchmarks._gameKey(df)
+    return df.sort_index()
+
+
+def test_features_match_legacy(configured, tmp_path):
+    new_file, legacy_file = str(tmp_path / "new.csv"), str(tmp_path / "legacy.csv")
+    build_dfs.createHumanFrame(outFile=new_file, mode='a')
+    benchmarks.createHumanFrameLegacy(outFile=legacy_file)
+
+    new_df, legacy_df = _readHuman(new_file), _readHuman(legacy_file)
+    assert len(new_df) > 0
+    assert list(new_df.columns) == list(legacy_df.columns)
+    assert list(new_df.index) == list(legacy_df.index)
+
+    same = [col for col in new_df.columns if col not in TIME_COLUMNS]
+    pd.testing.assert_frame_equal(new_df[same], legacy_df[same], check_dtype=False)
+    assert (np.abs(new_df[TIME_COLUMNS].values - legacy_df[TIME_COLUMNS].values) <= 1).all()
+
+
+def test_update_matches_rebuild(configured, tmp_path):
+    out_file = str(tmp_path / "human_table.csv")
+    full_file = str(tmp_path / "full.csv")
+
+    # first run on a history where the last gamedays are not played yet
+    earlier = tmp_path / "earlier"
+    earlier.mkdir()
+    writeHistory(str(earlier), unplayed_from=20)
+    build_dfs.configure(data_folder=str(earlier))
+    first = build_dfs.createHumanFrame(outFile=out_file, mode='a')
+
+    # then update with the played gamedays, and rebuild from scratch
+    build_dfs.configure(data_folder=configured.data_folder)
+    added = build_dfs.createHumanFrame(outFile=out_file, mode='u')
+    build_dfs.createHumanFrame(outFile=full_file, mode='a')
+
+    assert len(first) > 0 and len(added) > 0
+    pd.testing.assert_frame_equal(_readHuman(out_file), _readHuman(full_file))
+
+    keys = os.path.splitext(out_file)[0] + "_keys.npy"
+    full_keys = os.path.splitext(full_file)[0] + "_keys.npy"
+    assert sorted(np.load(keys)) == sorted(np.load(full_keys))
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+import asyncio
+from datetime import datetime
+
+import fetching
+
+
+def _fetcher():
+    fetcher = fetching.AsyncFetcher(min_interval=0)
+
+    async def fetchAll(urls):
+        return [("<html>" + url + "</html>", None, None, 200) for url in urls]
+
+    fetcher._fetchAll = fetchAll
+    return fetcher
+
+
+def test_fetch_all():
+    assert _fetcher().fetchAll(["a", "b", "a"]) == {"a": "<html>a</html>", "b": "<html>b</html>"}
+
+
+def test_fetch_all_in_running_loop():
+    """
+    Interactive sessions (Jupyter, Spyder) already run an event loop when fetchAll() is called
+    """
+    async def cell():
+        return _fetcher().fetchAll(["a"])
+
+    assert asyncio.run(cell()) == {"a": "<html>a</html>"}
+
+
+def test_cache_finished_season(tmp_path):
+    """
+    Pages of a past season only never expire if they were fetched after the season ended
+    """
+    url = "http://www.kicker.de/news/fussball/bundesliga/vereine/1-bundesliga/2017-18/a-1/vereinstermine.html"
+    cache = fetching.HtmlCache(str(tmp_path), current_season=18, max_age_hours=6)
+    cache.put(url, "<html>may</html>")
+
+    # fetched in May 2018, before the season ended
+    cache.index[url]["fetched"] = datetime(2018, 5, 1).timestamp()
+    assert cache.get(url) is None
+
+    cache.index[url]["fetched"] = datetime(2018, 8, 2).timestamp()
+    assert cache.get(url) == "<html>may</html>"
+
+    # current season pages expire
+    assert cache.maxAge(url.replace("2017-18", "2018-19"), datetime(2018, 8, 2).timestamp()) == 6 * 3600
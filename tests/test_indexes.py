@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+import pandas as pd
+
+import features
+import indexes
+
+
+def _coaches():
+    # b-2 sorts after a-1 and has a tenure before 1970
+    return indexes.CoachIndex(pd.DataFrame({"Team": ["a-1", "a-1", "b-2", "b-2"],
+                                            "von": ["01.07.1995", "01.07.2010", "01.07.1965", "01.07.1999"],
+                                            "bis": ["30.06.2010", None, "30.06.1999", None]}))
+
+
+def test_coach_days_since_before_1970():
+    coaches = _coaches()
+    dates = pd.to_datetime(["2012-01-01", "1966-01-01", "1960-01-01", "2000-01-01", "2012-01-01"])
+    days = coaches.daysSince(["a-1", "b-2", "b-2", "b-2", "c-3"], dates)
+    assert list(days) == [549, 184, 99999, 184, 99999]
+
+
+def test_coach_games_in_charge():
+    results = features.prepareResults(pd.DataFrame({
+        "Team": ["b-2"] * 3, "Score": ["1:0", "0:0", "-:-"], "Overtime": [0, 0, 0],
+        "Termin": ["Sa, 01.08.98 15:30", "So, 01.08.99 15:30", "Mi, 01.09.99 20:30"]}))
+    timeline = indexes.TeamTimeline(results)
+
+    games = _coaches().gamesInCharge(["b-2", "b-2", "a-1"], pd.to_datetime(["1999-06-01", "2000-01-01", "2000-01-01"]),
+                                     timeline)
+    assert list(games) == [1, 1, 0]
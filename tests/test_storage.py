@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import os
+
+import pandas as pd
+
+import storage
+
+
+def test_write_table_removes_stale_partitions(history, tmp_path):
+    raw = pd.read_csv(os.path.join(history, "AllTables.csv"), sep=";", encoding="utf8")
+    storage.writeTable(raw, "AllTables", str(tmp_path))
+    folder = str(tmp_path / "AllTables")
+    assert sorted(os.listdir(folder)) == ["Season=4_League=1.parquet", "Season=4_League=2.parquet",
+                                          "Season=5_League=1.parquet", "Season=5_League=2.parquet"]
+
+    # season 5 only: partitions of season 4 are gone, no temporary files left
+    storage.writeTable(raw[raw["Season"] == 5], "AllTables", str(tmp_path))
+    assert sorted(os.listdir(folder)) == ["Season=5_League=1.parquet", "Season=5_League=2.parquet"]
+    assert len(storage.readTable("AllTables", str(tmp_path))) == (raw["Season"] == 5).sum()
+
+
+def test_migrate_skips_built_frames(history, tmp_path):
+    """
+    human_table and ml stay csv files, only the scraped tables go to the store
+    """
+    csv_folder = tmp_path / "csv"
+    csv_folder.mkdir()
+    coaches = pd.read_csv(os.path.join(history, "AllTeamCoaches.csv"), sep=";", encoding="utf8")
+    coaches.to_csv(str(csv_folder / "AllTeamCoaches.csv"), sep=";")
+    pd.DataFrame({"Team1": ["a"], "Team2": ["b"]}).to_csv(str(csv_folder / "human_table.csv"), sep=";")
+
+    storage.migrateCsv(str(csv_folder), str(tmp_path / "store"))
+    assert os.listdir(str(tmp_path / "store")) == ["AllTeamCoaches"]